@@ -0,0 +1,38 @@
+from django.urls import re_path
+
+import api.urls
+import api.views
+
+from .async_views import async_read_view
+
+app_name = 'api'
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+urlpatterns = [
+    re_path(r'^categories/$',
+            async_read_view(api.views.CategoryViewSet, LIST_ACTIONS),
+            name='category-list'),
+    re_path(r'^genres/$',
+            async_read_view(api.views.GenreViewSet, LIST_ACTIONS),
+            name='genre-list'),
+    re_path(r'^titles/$',
+            async_read_view(api.views.TitleViewSet, LIST_ACTIONS),
+            name='title-list'),
+    re_path(r'^titles/(?P<pk>[^/.]+)/$',
+            async_read_view(api.views.TitleViewSet, DETAIL_ACTIONS),
+            name='title-detail'),
+    re_path(r'^titles/(?P<title_id>\d+)/reviews/$',
+            async_read_view(api.views.ReviewViewSet, LIST_ACTIONS),
+            name='review-list'),
+    re_path(r'^titles/(?P<title_id>\d+)/reviews/(?P<pk>[^/.]+)/$',
+            async_read_view(api.views.ReviewViewSet, DETAIL_ACTIONS),
+            name='review-detail'),
+    re_path(r'^titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments/$',
+            async_read_view(api.views.CommentViewSet, LIST_ACTIONS),
+            name='comment-list'),
+    re_path(r'^titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments/(?P<pk>[^/.]+)/$',
+            async_read_view(api.views.CommentViewSet, DETAIL_ACTIONS),
+            name='comment-detail'),
+] + api.urls.urlpatterns
@@ -0,0 +1,78 @@
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse
+from rest_framework.exceptions import APIException, NotAcceptable
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def read(viewset_class, action, request, kwargs):
+    """ Выполняет чтение списка или объекта средствами обычного вьюсета:
+    те же аутентификация, проверки прав и частоты запросов, queryset,
+    фильтры, пагинация и сериализаторы. Запросы к базе из этого потока
+    попадают в замеры текущего запроса через контекст, который передаёт
+    sync_to_async. Возвращает данные, статус и заголовки """
+    close_old_connections()
+    view = viewset_class(action_map={'get': action}, args=(), kwargs=kwargs, format_kwarg=None, headers={})
+    try:
+        drf_request = view.initialize_request(request, **kwargs)
+        view.request = drf_request
+        try:
+            view.initial(drf_request, **kwargs)
+            if action == 'retrieve':
+                return view.get_serializer(view.get_object()).data, 200, {}
+            queryset = view.filter_queryset(view.get_queryset())
+            page = view.paginate_queryset(queryset)
+            if page is None:
+                return view.get_serializer(queryset, many=True).data, 200, {}
+            return view.get_paginated_response(view.get_serializer(page, many=True).data).data, 200, {}
+        except (Http404, APIException) as exc:
+            response = view.handle_exception(exc)
+            return response.data, response.status_code, {
+                name: value for name, value in response.items() if name != 'Content-Type'
+            }
+    finally:
+        close_old_connections()
+
+
+def select_renderer(request):
+    """ Выбирает рендерер по заголовку Accept. Браузерный API требует
+    экземпляра представления, поэтому не участвует в выборе """
+    renderers = [
+        renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+        if renderer.format != 'api'
+    ]
+    negotiator = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS()
+    try:
+        return negotiator.select_renderer(Request(request), renderers)[0]
+    except NotAcceptable:
+        return renderers[0]
+
+
+def render(request, data, status=200):
+    renderer = select_renderer(request)
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+def async_read_view(viewset_class, actions):
+    """ Возвращает асинхронное представление для маршрута вьюсета.
+    GET-запросы выполняются в пуле потоков без привязки к общему потоку
+    синхронных представлений, поэтому медленные чтения SQLite не блокируют
+    друг друга. Остальные методы передаются обычному вьюсету """
+    sync_view = viewset_class.as_view(actions)
+    read_action = actions['get']
+    read_in_thread = sync_to_async(read, thread_sensitive=False)
+    write_in_thread = sync_to_async(sync_view, thread_sensitive=True)
+
+    async def view(request, **kwargs):
+        if request.method != 'GET':
+            return await write_in_thread(request, **kwargs)
+        data, status, headers = await read_in_thread(viewset_class, read_action, request, kwargs)
+        response = render(request, data, status=status)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    # csrf_exempt в Django 3.2 оборачивает представление синхронной функцией
+    view.csrf_exempt = True
+    return view
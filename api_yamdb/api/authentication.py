@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.enums import UserRoles
+
+User = get_user_model()
+
+ROLE_CLAIM = 'role'
+VERSION_CLAIM = 'ver'
+TOKEN_VERSION_KEY = 'auth:token-version:{}'
+
+
+def get_token_version(user_id):
+    """ Возвращает текущую версию токенов пользователя. Версия хранится
+    в базе, кэш только ускоряет чтение: при промахе она читается из базы.
+    Версия читается из основной базы, а не из реплики: реплика могла ещё
+    не получить отзыв токенов. Для удалённого пользователя возвращается None """
+    key = TOKEN_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.using('default').filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            cache.add(key, version, timeout=settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def revoke_tokens(user_ids):
+    """ Отзывает все выданные пользователям токены: версия увеличивается
+    в базе одним UPDATE, значения в кэше удаляются сразу и после фиксации
+    транзакции. Кэши других процессов (LocMemCache) и версия, прочитанная
+    до фиксации, устаревают не дольше TOKEN_VERSION_CACHE_TIMEOUT секунд """
+    keys = [TOKEN_VERSION_KEY.format(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    User.objects.filter(pk__in=user_ids).update(token_version=F('token_version') + 1)
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class RoleAccessToken(AccessToken):
+    """ Access-токен, в котором хранятся username, роль и версия токенов пользователя """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in user.get_token_claims().items():
+            token[claim] = value
+        token[VERSION_CLAIM] = user.token_version
+        cache.add(TOKEN_VERSION_KEY.format(user.pk), user.token_version,
+                  timeout=settings.TOKEN_VERSION_CACHE_TIMEOUT)
+        return token
+
+
+class RoleTokenUser(TokenUser):
+    """ Пользователь, восстановленный из токена без запроса к базе """
+
+    @cached_property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @property
+    def is_admin(self):
+        return self.role == UserRoles.admin.name
+
+    @property
+    def is_moderator(self):
+        return self.role == UserRoles.moderator.name
+
+    @property
+    def is_user(self):
+        return self.role == UserRoles.user.name
+
+    def to_model(self):
+        """ Возвращает объект User с данными из токена для ссылок на автора
+        и вывода его username. Объект не загружается из базы и не сохраняется """
+        user = User(
+            pk=self.pk, username=self.username, role=self.role,
+            is_staff=self.is_staff, is_superuser=self.is_superuser
+        )
+        user._state.adding = False
+        return user
+
+
+def as_model(user):
+    """ Возвращает объект модели User для пользователя запроса """
+    return user.to_model() if isinstance(user, RoleTokenUser) else user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """ JWT-аутентификация без запроса пользователя к базе.
+    Токены с ролью в payload превращаются в RoleTokenUser, если их версия
+    совпадает с текущей; токены без роли обрабатываются как раньше """
+
+    def get_user(self, validated_token):
+        if ROLE_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user = RoleTokenUser(validated_token)
+        if validated_token.get(VERSION_CLAIM) != get_token_version(user.pk):
+            raise AuthenticationFailed('Токен отозван', code='token_revoked')
+        return user
@@ -0,0 +1,37 @@
+from django.core.cache.backends import db, filebased, locmem, memcached
+
+from .timing import cache_counting_disabled, record_cache_lookup
+
+_missing = object()
+
+
+class CacheLookupMixin:
+    """ Считает попадания и промахи кэша для заголовка Server-Timing """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        record_cache_lookup(value is not _missing, value is _missing)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with cache_counting_disabled():
+            values = super().get_many(keys, version)
+        record_cache_lookup(len(values), len(keys) - len(values))
+        return values
+
+
+class LocMemCache(CacheLookupMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(CacheLookupMixin, filebased.FileBasedCache):
+    pass
+
+
+class DatabaseCache(CacheLookupMixin, db.DatabaseCache):
+    pass
+
+
+class PyMemcacheCache(CacheLookupMixin, memcached.PyMemcacheCache):
+    pass
@@ -0,0 +1,132 @@
+import contextvars
+import logging
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.db.utils import ConnectionDoesNotExist
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """ Настраивает новое соединение с SQLite прагмами из SQLITE_PRAGMAS
+    или из ключа PRAGMAS настроек базы. Прагмы выполняются на исходном
+    соединении sqlite3, чтобы не попадать в журнал запросов Django """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS', settings.SQLITE_PRAGMAS)
+    for name, value in pragmas.items():
+        if not PRAGMA_VALUE.match(str(name)) or not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f'Недопустимая прагма SQLite: {name}={value}')
+        result = connection.connection.execute(f'PRAGMA {name} = {value}').fetchone()
+        logger.debug('PRAGMA %s = %s: %s', name, value, result)
+
+
+def database_inode(connection):
+    try:
+        return os.stat(connection.settings_dict['NAME']).st_ino
+    except OSError:
+        return None
+
+
+@receiver(connection_created)
+def remember_database_inode(sender, connection, **kwargs):
+    """ Запоминает, какой файл базы SQLite открыло соединение """
+    if connection.vendor == 'sqlite':
+        connection.database_inode = database_inode(connection)
+
+
+def close_replaced_replica():
+    """ Закрывает постоянное соединение текущего потока с репликой, если
+    refresh_replica подменил её файл: иначе соединение читало бы старый файл,
+    пока не истечёт CONN_MAX_AGE. Стоит одного os.stat на запрос """
+    try:
+        connection = connections[settings.DATABASE_REPLICA]
+    except ConnectionDoesNotExist:
+        return
+    if connection.connection is not None and database_inode(connection) != getattr(connection, 'database_inode', None):
+        connection.close()
+
+
+# Обёртки execute_wrapper текущего запроса (замеры и журнал медленных запросов)
+request_wrappers = contextvars.ContextVar('request_wrappers', default=())
+
+
+def run_request_wrappers(execute, sql, params, many, context):
+    """ Постоянная обёртка каждого соединения: выполняет запрос через обёртки
+    текущего запроса. Они берутся из contextvar, поэтому действуют в любом
+    потоке, куда asgiref передал контекст запроса, в том числе в потоках
+    sync_to_async асинхронного стека """
+    for wrapper in reversed(request_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_request_wrappers(sender, connection, **kwargs):
+    if run_request_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, run_request_wrappers)
+
+
+@contextmanager
+def wrap_connections(*wrappers):
+    """ Подключает обёртки ко всем запросам к базе в текущем контексте """
+    token = request_wrappers.set(request_wrappers.get() + wrappers)
+    try:
+        yield
+    finally:
+        request_wrappers.reset(token)
+
+
+# База для чтения в текущем запросе, её выбирает ReplicaRoutingMiddleware
+read_database = contextvars.ContextVar('read_database', default='default')
+
+
+class ReplicaRouter:
+    """ Отправляет чтения безопасных запросов в реплику, а запись — в основную базу.
+    Вне запросов, в небезопасных запросах и в течение DATABASE_REPLICA_STICKY
+    секунд после записи клиента чтения тоже идут в основную базу """
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика — копия основной базы, миграции к ней не применяются
+        return db == 'default'
+
+
+def refresh_replica(source, target):
+    """ Копирует основную базу в файл реплики через backup API SQLite.
+    Копия собирается во временном файле и подменяет реплику атомарно:
+    открытые соединения дочитывают старый файл. Постоянные соединения
+    (CONN_MAX_AGE) воркеров переоткрываются перед следующим чтением
+    реплики, см. close_replaced_replica """
+    temporary = f'{target}.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    primary = sqlite3.connect(f'file:{source}?mode=ro', uri=True)
+    replica = sqlite3.connect(temporary)
+    try:
+        primary.backup(replica)
+        # Без WAL у реплики нет файлов -wal и -shm, которые остались бы от старой копии
+        replica.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        replica.close()
+        primary.close()
+    os.replace(temporary, target)
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from contextlib import suppress
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_CHANNEL = 'reviews'
+
+
+def title_channel(title_id):
+    """ Возвращает имя канала событий произведения """
+    return f'title:{title_id}'
+
+
+class LocalBackend:
+    """ Доставляет события только подписчикам текущего процесса """
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+    def stop(self):
+        pass
+
+
+class UnixSocketBackend:
+    """ Рассылает события всем процессам-воркерам одного сервера.
+    Каждый процесс слушает свой unix datagram сокет в общем каталоге,
+    а публикация отправляет датаграмму во все сокеты каталога """
+
+    max_datagram_size = 65536
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.EVENTS_SOCKET_DIR
+        self.path = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock')
+
+    def start(self, deliver):
+        self.deliver = deliver
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.receiver.bind(self.path)
+        self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.thread = threading.Thread(target=self.listen, name='events-listener', daemon=True)
+        self.thread.start()
+
+    def listen(self):
+        """ Принимает датаграммы, пока сокет не закрыт. Ошибка в одной
+        датаграмме или у подписчика не должна останавливать поток """
+        while True:
+            try:
+                datagram = self.receiver.recv(self.max_datagram_size)
+            except OSError:
+                return
+            try:
+                channel, message = json.loads(datagram)
+                self.deliver(channel, message)
+            except Exception:
+                logger.exception('Не удалось доставить событие из %s', self.path)
+
+    def publish(self, channel, message):
+        datagram = json.dumps((channel, message), cls=JSONEncoder).encode()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith('.sock'):
+                continue
+            try:
+                self.sender.sendto(datagram, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Сокет остался от завершившегося воркера
+                with suppress(OSError):
+                    os.unlink(path)
+            except OSError:
+                logger.warning('Не удалось отправить событие в %s', path, exc_info=True)
+
+    def stop(self):
+        self.receiver.close()
+        self.sender.close()
+        with suppress(OSError):
+            os.unlink(self.path)
+
+
+class Subscription:
+    """ Очередь событий одного подключённого клиента """
+
+    def __init__(self, broadcaster, channel, maxsize):
+        self.broadcaster = broadcaster
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        """ Кладёт событие в очередь из потока цикла событий.
+        Если клиент не успевает читать, событие для него отбрасывается """
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning('Очередь событий канала %s переполнена', self.channel)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """ Рассылает события о новых отзывах и комментариях подписчикам.
+    Публикация возможна из любого потока, доставка выполняется
+    в цикле событий подписчика """
+
+    def __init__(self, backend=None, queue_size=None):
+        self.backend = backend or LocalBackend()
+        self.queue_size = queue_size or settings.EVENTS_QUEUE_SIZE
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+        self.backend.start(self.deliver)
+
+    def subscribe(self, channel):
+        """ Подписывает вызывающую корутину на канал """
+        subscription = Subscription(self, channel, self.queue_size)
+        with self.lock:
+            self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.channel, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.channel, None)
+
+    def publish(self, channel, message):
+        self.backend.publish(channel, message)
+
+    def deliver(self, channel, message):
+        with self.lock:
+            subscriptions = tuple(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # Цикл событий клиента уже закрыт
+                self.unsubscribe(subscription)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """ Возвращает общий для процесса Broadcaster с бэкендом из настройки EVENTS_BACKEND """
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                backend = import_string(settings.EVENTS_BACKEND)()
+                _broadcaster = Broadcaster(backend)
+    return _broadcaster
+
+
+def publish_event(event, title_id, data):
+    """ Публикует событие в канал произведения и в общий канал """
+    message = {'event': event, 'title_id': title_id, 'data': data}
+    broadcaster = get_broadcaster()
+    broadcaster.publish(title_channel(title_id), message)
+    broadcaster.publish(GLOBAL_CHANNEL, message)
@@ -1,6 +1,9 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
 
 from reviews.models import Title
+from users.search import search_users
 
 
 class TitleFilter(filters.FilterSet):
@@ -24,3 +27,15 @@ class TitleFilter(filters.FilterSet):
     class Meta:
         model = Title
         fields = ('category', 'genre', 'name', 'year')
+
+
+class UsernameSearchFilter(BaseFilterBackend):
+    """ Поиск пользователей параметром search: ?search=name — вхождение
+    в username без учёта регистра, ?search=^name — начало username без учёта
+    регистра и ?search==name — точное совпадение. Два последних используют индексы """
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(api_settings.SEARCH_PARAM, '').strip()
+        if not term:
+            return queryset
+        return search_users(queryset, term)
@@ -0,0 +1,175 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from api import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    """ Очередь писем, которые отправляет фоновый поток.
+    Поток собирает письма за EMAIL_BATCH_WINDOW секунд (не больше
+    EMAIL_BATCH_SIZE) и отправляет их через одно соединение с почтовым сервером.
+    Неудачная отправка повторяется с растущей задержкой, письмо, так и не
+    отправленное за EMAIL_QUEUE_MAX_RETRIES повторов, записывается в журнал
+    EMAIL_DEAD_LETTER_FILE. При EMAIL_QUEUE_EAGER письма отправляются сразу """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.done = threading.Condition(self.lock)
+        self.stats = {
+            'batches': 0, 'sent': 0, 'retried': 0, 'failed': 0,
+            'max_batch_size': 0, 'send_time': 0.0,
+        }
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            if self.thread is None:
+                atexit.register(self.join, settings.EMAIL_QUEUE_SHUTDOWN_TIMEOUT)
+            self.thread = threading.Thread(target=self.work, name='mail-worker', daemon=True)
+            self.thread.start()
+
+    def enqueue(self, **message):
+        """ Ставит письмо в очередь, аргументы те же, что у send_mail """
+        job = {'message': message, 'attempts': 0}
+        if settings.EMAIL_QUEUE_EAGER:
+            jobs = [job]
+            while jobs:
+                jobs = self.send_batch(jobs)
+            return
+        with self.lock:
+            self.pending += 1
+        self.start()
+        self.queue.put(job)
+
+    def join(self, timeout=None):
+        """ Ждёт, пока все письма будут отправлены или попадут в журнал ошибок.
+        Возвращает False, если за timeout секунд очередь не опустела """
+        with self.done:
+            return self.done.wait_for(lambda: not self.pending, timeout)
+
+    def metrics(self):
+        """ Возвращает счётчики отправки, число писем в очереди (pending),
+        средний размер пакета и пропускную способность в письмах в секунду """
+        with self.lock:
+            stats = dict(self.stats, pending=self.pending)
+        stats['avg_batch_size'] = stats['sent'] / stats['batches'] if stats['batches'] else 0
+        stats['throughput'] = stats['sent'] / stats['send_time'] if stats['send_time'] else 0
+        return stats
+
+    def collect(self):
+        """ Ждёт первое письмо и добирает к нему письма, пришедшие за окно пакета """
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + settings.EMAIL_BATCH_WINDOW
+        while len(batch) < settings.EMAIL_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def work(self):
+        while True:
+            batch = self.collect()
+            try:
+                retries = self.send_batch(batch)
+            except Exception:
+                logger.exception('Ошибка обработки пакета писем')
+                retries = []
+            for job in retries:
+                delay = settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (job['attempts'] - 1)
+                timer = threading.Timer(delay, self.queue.put, (job,))
+                timer.daemon = True
+                timer.start()
+            with self.done:
+                self.pending -= len(batch) - len(retries)
+                self.done.notify_all()
+
+    def send_batch(self, jobs):
+        """ Отправляет пакет писем через одно соединение.
+        Возвращает письма, отправку которых нужно повторить """
+        retries = []
+        sent = 0
+        started = time.monotonic()
+        connection = get_connection()
+        try:
+            connection.open()
+            for job in jobs:
+                try:
+                    connection.send_messages([self.build_message(job['message'], connection)])
+                    sent += 1
+                except Exception as error:
+                    self.handle_failure(job, error, retries)
+        except Exception as error:
+            # Соединение не открылось: неотправленными считаются все письма пакета
+            for job in jobs:
+                self.handle_failure(job, error, retries)
+        finally:
+            connection.close()
+        elapsed = time.monotonic() - started
+        with self.lock:
+            self.stats['batches'] += 1
+            self.stats['sent'] += sent
+            self.stats['retried'] += len(retries)
+            self.stats['failed'] += len(jobs) - sent - len(retries)
+            self.stats['max_batch_size'] = max(self.stats['max_batch_size'], len(jobs))
+            self.stats['send_time'] += elapsed
+        logger.info('Отправлено писем: %s из %s за %.3f с', sent, len(jobs), elapsed)
+        return retries
+
+    def handle_failure(self, job, error, retries):
+        """ Откладывает письмо на повтор или, если попытки кончились, пишет его в журнал """
+        job['attempts'] += 1
+        if job['attempts'] <= settings.EMAIL_QUEUE_MAX_RETRIES:
+            logger.warning(
+                'Не удалось отправить письмо %s, попытка %s',
+                job['message']['recipient_list'], job['attempts'], exc_info=True
+            )
+            retries.append(job)
+        else:
+            self.dead_letter(job, error)
+
+    def build_message(self, message, connection):
+        return EmailMessage(
+            subject=message['subject'],
+            body=message['message'],
+            from_email=message['from_email'],
+            to=message['recipient_list'],
+            connection=connection,
+        )
+
+    def dead_letter(self, job, error):
+        """ Записывает неотправленное письмо в журнал, откуда его можно отправить вручную """
+        logger.error('Письмо %s не отправлено: %r', job['message']['recipient_list'], error)
+        path = settings.EMAIL_DEAD_LETTER_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = dict(job, error=repr(error), failed_at=time.time())
+        with open(path, 'a', encoding='utf-8') as dead_letters:
+            dead_letters.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+mail_queue = MailQueue()
+
+for name, kind, description, key in (
+    ('yamdb_mail_queue_size', 'gauge', 'Писем в очереди, включая ожидающие повтора.', 'pending'),
+    ('yamdb_mail_sent_total', 'counter', 'Отправленных писем.', 'sent'),
+    ('yamdb_mail_retries_total', 'counter', 'Повторных попыток отправки писем.', 'retried'),
+    ('yamdb_mail_dead_letters_total', 'counter', 'Писем, записанных в журнал неотправленных.', 'failed'),
+):
+    metrics.register(name, kind, description, lambda key=key: mail_queue.metrics()[key])
@@ -0,0 +1,20 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы метрик воркеров из METRICS_DIR перед запуском сервера'
+
+    def handle(self, *args, **options):
+        if not settings.METRICS_DIR:
+            raise CommandError('Каталог метрик не настроен: задайте METRICS_DIR')
+        if not os.path.isdir(settings.METRICS_DIR):
+            return
+        removed = 0
+        for name in os.listdir(settings.METRICS_DIR):
+            if name.endswith(('.json', '.json.tmp')):
+                os.remove(os.path.join(settings.METRICS_DIR, name))
+                removed += 1
+        self.stdout.write(f'Удалено файлов метрик: {removed}')
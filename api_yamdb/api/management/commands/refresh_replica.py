@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.database import refresh_replica
+
+
+class Command(BaseCommand):
+    help = 'Обновляет файл реплики SQLite копией основной базы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять обновление каждые N секунд, по умолчанию обновить один раз'
+        )
+        parser.add_argument('--source', help='Файл основной базы')
+        parser.add_argument('--target', help='Файл реплики')
+
+    def handle(self, *args, **options):
+        source = options['source'] or settings.DATABASES['default']['NAME']
+        target = options['target']
+        if target is None and settings.DATABASE_REPLICA:
+            target = settings.DATABASES[settings.DATABASE_REPLICA]['NAME']
+        if target is None:
+            raise CommandError('Реплика не настроена: задайте DB_REPLICA_PATH или --target')
+        while True:
+            started = time.monotonic()
+            refresh_replica(source, target)
+            self.stdout.write(f'Реплика {target} обновлена за {time.monotonic() - started:.3f} с')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,35 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.slow_queries import aggregate, read_log
+
+SORT_KEYS = ('total_ms', 'count', 'max_ms', 'avg_ms')
+
+
+class Command(BaseCommand):
+    help = 'Показывает самые затратные запросы из журнала медленных запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Сколько запросов показать')
+        parser.add_argument(
+            '--sort', choices=SORT_KEYS, default='total_ms',
+            help='Порядок: суммарное время, число, максимальное или среднее время'
+        )
+        parser.add_argument('--file', help='Журнал, по умолчанию SLOW_QUERY_LOG_FILE')
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.SLOW_QUERY_LOG_FILE
+        if not os.path.exists(path):
+            raise CommandError(f'Журнал {path} не найден')
+        summary = sorted(aggregate(read_log(path)), key=lambda item: item[options['sort']], reverse=True)
+        for number, item in enumerate(summary[:options['top']], 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{number}. {item["count"]} запросов, всего {item["total_ms"]:.1f} мс, '
+                f'в среднем {item["avg_ms"]:.1f} мс, максимум {item["max_ms"]:.1f} мс'
+            ))
+            self.stdout.write(f'   Представления: {", ".join(item["views"])}')
+            self.stdout.write(f'   {item["fingerprint"]}')
+            for line in item['plan'] or ():
+                self.stdout.write(f'     {line}')
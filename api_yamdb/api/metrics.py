@@ -0,0 +1,227 @@
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Верхние границы корзин гистограммы времени ответа, в секундах
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+COUNT, DURATION, QUERIES = range(3)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Метрики процесса вне запросов: имя -> (тип, описание, функция чтения)
+PROCESS_METRICS = {}
+
+
+def register(name, kind, description, read):
+    """ Добавляет в /metrics значение, которое возвращает read().
+    При METRICS_DIR значения суммируются по воркерам """
+    PROCESS_METRICS[name] = (kind, description, read)
+
+
+class Shard:
+    """ Набор счётчиков одного потока. Когда поток завершается, объект
+    удаляется вместе с данными потока и счётчики переносятся в общий итог """
+    __slots__ = ('counters', '__weakref__')
+
+    def __init__(self):
+        self.counters = {}
+
+
+class MetricsRegistry:
+    """ Счётчики запросов по маршрутам: число, время, SQL-запросы и гистограмма.
+    Каждый поток пишет только в свой набор счётчиков, поэтому запись идёт без
+    блокировок; наборы суммируются при чтении. Счётчики завершившихся потоков
+    складываются в общий итог, поэтому число наборов не растёт при сервере,
+    создающем поток на каждый запрос. Если задан METRICS_DIR, процесс
+    раз в METRICS_FLUSH_INTERVAL секунд сохраняет свои счётчики в файл каталога,
+    а /metrics суммирует файлы всех воркеров """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.shards = {}
+        self.retired = {}
+        self.numbers = itertools.count()
+        # Поток может завершиться и сдать счётчики, пока сборка мусора
+        # идёт внутри snapshot() этого же потока
+        self.lock = threading.RLock()
+        self.flusher = None
+        self.pid = self.name = None
+
+    def shard(self):
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = self.local.shard = Shard()
+            number = next(self.numbers)
+            with self.lock:
+                self.shards[number] = shard.counters
+            weakref.finalize(shard, self.retire, number)
+            if settings.METRICS_DIR and self.flusher is None:
+                self.start_flusher()
+        return shard.counters
+
+    def retire(self, number):
+        """ Переносит счётчики завершившегося потока в общий итог """
+        with self.lock:
+            for key, stats in self.shards.pop(number).items():
+                merge(self.retired, key, stats)
+
+    def observe(self, route, method, status, duration, queries):
+        """ Учитывает завершённый запрос """
+        shard = self.shard()
+        key = (route, method, status)
+        stats = shard.get(key)
+        if stats is None:
+            stats = shard[key] = [0, 0.0, 0] + [0] * len(BUCKETS)
+        stats[COUNT] += 1
+        stats[DURATION] += duration
+        stats[QUERIES] += queries
+        stats[3 + bisect_left(BUCKETS, duration)] += 1
+
+    def snapshot(self):
+        """ Суммирует счётчики всех потоков процесса """
+        with self.lock:
+            merged = {key: list(stats) for key, stats in self.retired.items()}
+            for shard in list(self.shards.values()):
+                for key, stats in list(shard.items()):
+                    merge(merged, key, stats)
+        return merged
+
+    def values(self):
+        """ Читает метрики процесса из PROCESS_METRICS """
+        return {name: read() for name, (_, _, read) in PROCESS_METRICS.items()}
+
+    def path(self):
+        # В имени файла кроме pid время первой записи процесса: новый процесс
+        # с тем же pid не перезапишет файл прежнего
+        if self.pid != os.getpid():
+            self.pid, self.name = os.getpid(), f'{os.getpid()}-{time.time_ns()}.json'
+        return os.path.join(settings.METRICS_DIR, self.name)
+
+    def flush(self):
+        """ Атомарно сохраняет счётчики процесса в файл каталога METRICS_DIR """
+        if not settings.METRICS_DIR:
+            return
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = self.path()
+        data = {
+            'requests': [[*key, stats] for key, stats in self.snapshot().items()],
+            'values': self.values(),
+        }
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(data, file)
+        os.replace(f'{path}.tmp', path)
+
+    def start_flusher(self):
+        with self.lock:
+            if self.flusher is not None:
+                return
+            stop = threading.Event()
+
+            def run():
+                while not stop.wait(settings.METRICS_FLUSH_INTERVAL):
+                    self.flush()
+
+            self.flusher = threading.Thread(target=run, name='metrics-flusher', daemon=True)
+            self.flusher.start()
+        atexit.register(self.flush)
+
+    def collect(self):
+        """ Возвращает счётчики запросов и метрики процесса
+        или, при METRICS_DIR, их суммы по всем воркерам """
+        if not settings.METRICS_DIR:
+            return self.snapshot(), self.values()
+        self.flush()
+        merged = {}
+        values = {}
+        for name in os.listdir(settings.METRICS_DIR):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, name)) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for route, method, status, stats in data['requests']:
+                merge(merged, (route, method, status), stats)
+            for name, value in data['values'].items():
+                values[name] = values.get(name, 0) + value
+        return merged, values
+
+
+def merge(merged, key, stats):
+    total = merged.get(key)
+    if total is None:
+        merged[key] = list(stats)
+    else:
+        for index, value in enumerate(stats):
+            total[index] += value
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render(metrics, values=None):
+    """ Формирует текст в формате Prometheus """
+    histograms = {}
+    for (route, method, status), stats in metrics.items():
+        merge(histograms, (route, method), stats)
+    lines = [
+        '# HELP yamdb_requests_total Число запросов к API.',
+        '# TYPE yamdb_requests_total counter',
+    ]
+    for (route, method, status), stats in sorted(metrics.items()):
+        lines.append(
+            f'yamdb_requests_total{{route="{escape(route)}",method="{method}",status="{status}"}} '
+            f'{stats[COUNT]}'
+        )
+    lines += [
+        '# HELP yamdb_request_errors_total Число ответов API с ошибкой сервера.',
+        '# TYPE yamdb_request_errors_total counter',
+    ]
+    errors = {}
+    for (route, method, status), stats in metrics.items():
+        errors[(route, method)] = errors.get((route, method), 0) + (stats[COUNT] if status >= 500 else 0)
+    for (route, method), count in sorted(errors.items()):
+        lines.append(f'yamdb_request_errors_total{{route="{escape(route)}",method="{method}"}} {count}')
+    lines += [
+        '# HELP yamdb_db_queries_total Число SQL-запросов при обработке запросов к API.',
+        '# TYPE yamdb_db_queries_total counter',
+    ]
+    for (route, method), stats in sorted(histograms.items()):
+        lines.append(f'yamdb_db_queries_total{{route="{escape(route)}",method="{method}"}} {stats[QUERIES]}')
+    lines += [
+        '# HELP yamdb_request_duration_seconds Время обработки запроса к API.',
+        '# TYPE yamdb_request_duration_seconds histogram',
+    ]
+    for (route, method), stats in sorted(histograms.items()):
+        labels = f'route="{escape(route)}",method="{method}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stats[3:]):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'yamdb_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'yamdb_request_duration_seconds_sum{{{labels}}} {stats[DURATION]:.6f}')
+        lines.append(f'yamdb_request_duration_seconds_count{{{labels}}} {stats[COUNT]}')
+    for name, value in sorted((values or {}).items()):
+        if name not in PROCESS_METRICS:
+            continue
+        kind, description, _ = PROCESS_METRICS[name]
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}', f'{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    """ Отдаёт метрики для Prometheus адресам из METRICS_ALLOWED_IPS """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(render(*registry.collect()), content_type=CONTENT_TYPE)
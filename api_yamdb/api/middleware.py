@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from .database import close_replaced_replica, read_database, wrap_connections
+from .metrics import registry
+from .slow_queries import SlowQueryLog
+from .timing import RequestTiming, current_timing
+
+timing_logger = logging.getLogger('api.timing')
+
+STICKY_KEY = 'db:sticky:{}'
+
+
+class SyncAsyncMiddleware:
+    """ Основа middleware, которые работают и в синхронном, и в асинхронном
+    стеке. Синхронное middleware заставило бы Django под ASGI выполнять всю
+    цепочку в одном общем потоке, и асинхронные представления шли бы по одному.
+    Если get_response — корутина, вызов передаётся в __acall__ """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django 3.2 узнаёт асинхронный экземпляр, см. MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class ReplicaRoutingMiddleware(SyncAsyncMiddleware):
+    """ Выбирает базу для чтений запроса: безопасные запросы читают реплику,
+    кроме клиентов, которые недавно что-то записали. Клиент определяется
+    по заголовку Authorization, для анонимных запросов — по IP.
+    Отметка о записи хранится в кэше default. С LocMemCache она видна только
+    процессу, который выполнил запись: запрос к другому воркеру может прочитать
+    реплику без этой записи. Чтение своих записей между воркерами гарантирует
+    только общий кэш, например api.cache.PyMemcacheCache """
+
+    def handle(self, request):
+        use_replica = self.use_replica(request)
+        if use_replica:
+            close_replaced_replica()
+        token = read_database.set(settings.DATABASE_REPLICA if use_replica else 'default')
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.remember_write(request, response)
+
+    async def __acall__(self, request):
+        use_replica = self.use_replica(request)
+        if use_replica:
+            # Соединения привязаны к потоку: синхронные представления
+            # выполняются в общем потоке sync_to_async
+            await sync_to_async(close_replaced_replica)()
+        token = read_database.set(settings.DATABASE_REPLICA if use_replica else 'default')
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.remember_write(request, response)
+
+    def use_replica(self, request):
+        key = STICKY_KEY.format(self.get_client_ident(request))
+        return request.method in SAFE_METHODS and not cache.get(key)
+
+    def remember_write(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            key = STICKY_KEY.format(self.get_client_ident(request))
+            cache.set(key, True, settings.DATABASE_REPLICA_STICKY)
+        return response
+
+    def get_client_ident(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if authorization:
+            return hashlib.sha1(authorization.encode()).hexdigest()
+        return request.META.get('REMOTE_ADDR', '')
+
+
+class ServerTimingMiddleware(SyncAsyncMiddleware):
+    """ Замеряет запросы к API: общее время, время и число SQL-запросов,
+    фазы представления и обращения к кэшу. Результат отдаётся в заголовке
+    Server-Timing, пишется строкой JSON в журнал api.timing и, при METRICS_ENABLED,
+    учитывается в метриках маршрута (api.metrics) """
+
+    def handle(self, request):
+        if not request.path.startswith(settings.SERVER_TIMING_PATH_PREFIX):
+            return self.get_response(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            with wrap_connections(timing.execute_wrapper):
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.report(request, response, timing)
+
+    async def __acall__(self, request):
+        if not request.path.startswith(settings.SERVER_TIMING_PATH_PREFIX):
+            return await self.get_response(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            with wrap_connections(timing.execute_wrapper):
+                response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.report(request, response, timing)
+
+    def report(self, request, response, timing):
+        if settings.METRICS_ENABLED:
+            match = request.resolver_match
+            registry.observe(
+                match.view_name if match else '<unresolved>', request.method,
+                response.status_code, timing.total, timing.queries
+            )
+        response['Server-Timing'] = timing.server_timing()
+        timing_logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **timing.as_dict(),
+        }))
+        return response
+
+
+class SlowQueryMiddleware(SyncAsyncMiddleware):
+    """ Записывает медленные SQL-запросы представлений в журнал (api.slow_queries) """
+
+    def handle(self, request):
+        with wrap_connections(SlowQueryLog(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with wrap_connections(SlowQueryLog(request)):
+            return await self.get_response(request)
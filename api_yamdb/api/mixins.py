@@ -1,10 +1,45 @@
-from rest_framework import filters, mixins, viewsets
+from django.db import IntegrityError
+from rest_framework import filters, mixins, status, viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from .permissions import AnonimReadOnly, IsSuperUserOrIsAdminOnly
+from .timing import phase
 
 
-class CreateListDestroyViewSet(mixins.CreateModelMixin,
+class TimedListMixin:
+    """ Делит время list на фазы для заголовка Server-Timing:
+    filter — построение queryset, query — выборка страницы,
+    serialize — сериализация """
+
+    def list(self, request, *args, **kwargs):
+        with phase('filter'):
+            queryset = self.filter_queryset(self.get_queryset())
+        with phase('query'):
+            page = self.paginate_queryset(queryset)
+        with phase('serialize'):
+            data = self.get_serializer(queryset if page is None else page, many=True).data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class TimedRetrieveMixin:
+    """ Делит время retrieve на фазы для заголовка Server-Timing:
+    query — выборка объекта, serialize — сериализация """
+
+    def retrieve(self, request, *args, **kwargs):
+        with phase('query'):
+            instance = self.get_object()
+        with phase('serialize'):
+            data = self.get_serializer(instance).data
+        return Response(data)
+
+
+class CreateListDestroyViewSet(TimedListMixin,
+                               mixins.CreateModelMixin,
                                mixins.ListModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
@@ -16,3 +51,32 @@ class CreateListDestroyViewSet(mixins.CreateModelMixin,
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+
+
+class BulkCreateMixin:
+    """ Массовое создание объектов списком за одну транзакцию.
+    Ошибки возвращаются списком, по одному элементу на каждый объект запроса """
+
+    bulk_serializer_class = None
+
+    def perform_bulk_create(self, request, **context):
+        serializer = self.bulk_serializer_class(
+            data=request.data,
+            many=True,
+            context={**self.get_serializer_context(), **context}
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            instances = serializer.save()
+        except IntegrityError:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Данные изменились во время создания, повторите запрос'
+                ]
+            })
+        self.bulk_created(instances)
+        data = self.bulk_serializer_class(instances, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def bulk_created(self, instances):
+        """ Вызывается после массового создания: bulk_create не отправляет post_save """
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ReviewFeedPagination(CursorPagination):
+    """ Постраничная выдача ленты отзывов по курсору.
+    Позиция задаётся датой публикации, поэтому следующая страница читается
+    по индексу (pub_date, id) без OFFSET и подсчёта общего числа отзывов """
+
+    ordering = ('-pub_date', '-id')
@@ -9,6 +9,15 @@ class IsSuperUserOrIsAdminOnly(permissions.BasePermission):
                 request.user.is_admin or request.user.is_superuser or request.user.is_staff)
 
 
+class IsModeratorOrIsAdminOrIsSuperUserOnly(permissions.BasePermission):
+    """ Разрешает запросы только модераторам, администраторам и суперпользователям """
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+                request.user.is_moderator or request.user.is_admin
+                or request.user.is_superuser or request.user.is_staff)
+
+
 class AnonimReadOnly(permissions.BasePermission):
     """ Разрешает анонимному пользователю только безопасные запросы """
 
@@ -26,5 +35,6 @@ class IsAuthorOrIsModeratorOrIsAdminOrIsSuperUserOnly(permissions.BasePermission
         )
 
     def has_object_permission(self, request, view, obj):
-        return (obj.author == request.user or request.user.is_admin or request.user.is_moderator
+        return (request.method in permissions.SAFE_METHODS
+                or obj.author_id == request.user.pk or request.user.is_admin or request.user.is_moderator
                 or request.user.is_staff or request.user.is_superuser)
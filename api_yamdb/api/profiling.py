@@ -0,0 +1,112 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import uuid
+from contextlib import suppress
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import StatelessJWTAuthentication
+from .middleware import SyncAsyncMiddleware
+from .permissions import IsSuperUserOrIsAdminOnly
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_ID = re.compile(r'^\d+-[0-9a-f]{8}$')
+
+
+def can_profile(user):
+    """ Профилировать запросы могут администраторы и суперпользователи """
+    return user.is_authenticated and (user.is_admin or user.is_superuser or user.is_staff)
+
+
+def profile_path(profile_id):
+    return os.path.join(settings.PROFILE_DIR, f'{profile_id}.prof')
+
+
+def save_profile(profiler):
+    """ Сохраняет профиль в PROFILE_DIR и удаляет старые сверх PROFILE_KEEP """
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    profile_id = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+    profiler.dump_stats(profile_path(profile_id))
+    profiles = sorted(name for name in os.listdir(settings.PROFILE_DIR) if name.endswith('.prof'))
+    for name in profiles[:-settings.PROFILE_KEEP]:
+        with suppress(OSError):
+            os.unlink(os.path.join(settings.PROFILE_DIR, name))
+    return profile_id
+
+
+class ProfilingMiddleware(SyncAsyncMiddleware):
+    """ Выполняет запрос под cProfile, если администратор прислал заголовок
+    X-Profile: 1. Профиль сохраняется в PROFILE_DIR, а ответ получает заголовки
+    X-Profile-Id и X-Profile-Url со ссылкой для скачивания. Запросы без
+    заголовка проходят без профилирования.
+    cProfile видит только свой поток, поэтому под ASGI профилируемый запрос
+    выполняется синхронно в потоке профилировщика: туда же asgiref отправляет
+    синхронные представления. Код, который асинхронные представления уносят
+    в другие потоки (thread_sensitive=False), в профиль не попадает """
+
+    def handle(self, request):
+        if request.META.get(PROFILE_HEADER) != '1' or not can_profile(self.get_user(request)):
+            return self.get_response(request)
+        return self.profile(self.get_response, request)
+
+    async def __acall__(self, request):
+        if request.META.get(PROFILE_HEADER) != '1':
+            return await self.get_response(request)
+        user = await sync_to_async(self.get_user)(request)
+        if not can_profile(user):
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(async_to_sync(self.get_response), request)
+
+    def profile(self, get_response, request):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В потоке уже работает другой профилировщик
+            return get_response(request)
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+        profile_id = save_profile(profiler)
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Url'] = reverse('profile', args=[profile_id])
+        return response
+
+    def get_user(self, request):
+        """ Пользователь сессии (админка) или JWT-токена (API).
+        Для запросов к API сессии не загружаются, request.user там нет """
+        user = getattr(request, 'user', AnonymousUser())
+        if user.is_authenticated:
+            return user
+        try:
+            authenticated = StatelessJWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return user
+        return authenticated[0] if authenticated else user
+
+
+@api_view(['GET'])
+@permission_classes([IsSuperUserOrIsAdminOnly])
+def profile_view(request, profile_id):
+    """ Отдаёт сохранённый профиль: файл pstats для snakeviz и pstats
+    или, с ?output=text, самые затратные функции по накопленному времени """
+    path = profile_path(profile_id)
+    if not PROFILE_ID.match(profile_id) or not os.path.exists(path):
+        raise Http404
+    if request.query_params.get('output') != 'text':
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof')
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats('cumulative').print_stats(settings.PROFILE_TEXT_LIMIT)
+    return HttpResponse(output.getvalue(), content_type='text/plain; charset=utf-8')
@@ -0,0 +1,93 @@
+import math
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+# Типы, которые orjson не сериализует сам или сериализует иначе, чем DRF:
+# даты с Z вместо +00:00, Decimal, ленивые строки перевода, QuerySet
+_default = JSONEncoder().default
+
+
+def _has_non_finite(value):
+    """ Есть ли в данных NaN или бесконечность: orjson пишет их как null """
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(_has_non_finite(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_non_finite(item) for item in value)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """ JSON-рендерер на orjson с тем же результатом, что у JSONRenderer DRF.
+    Без orjson, для ответов с отступами (indent), для ensure_ascii
+    и для NaN и бесконечностей используется обычный JSONRenderer """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(
+                data, default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            # Например, целые больше 64 бит: пусть решает стандартный json
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in rendered and _has_non_finite(data):
+            # JSONRenderer отклоняет их с ValueError, а не заменяет на null
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем U+2028 и U+2029 для JavaScript
+        if b'\xe2\x80\xa8' in rendered or b'\xe2\x80\xa9' in rendered:
+            rendered = rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return rendered
+
+
+class MessagePackRenderer(BaseRenderer):
+    """ MessagePack для внутренних клиентов, выбирается заголовком
+    Accept: application/msgpack. Значения, которых нет в MessagePack,
+    кодируются так же, как в JSON. Требует пакет msgpack """
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class CBORRenderer(BaseRenderer):
+    """ CBOR (Accept: application/cbor). Даты и Decimal кодируются тегами
+    CBOR, остальные значения — как в JSON. Требует пакет cbor2 """
+
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(data, default=lambda encoder, value: encoder.encode(_default(value)))
@@ -1,35 +1,75 @@
+from collections.abc import Mapping
+
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
 from reviews.models import Category, Comment, Genre, Review, Title
 
+from users.enums import UserRoles
+
+from .authentication import as_model, revoke_tokens
+
 User = get_user_model()
 
+DUPLICATE_REVIEW_MESSAGE = 'Вы уже оставляли отзыв на это произведение'
+BULK_MAX_ITEMS = 1000
+# Наибольший первичный ключ в SQLite, больший id не найдётся и переполнит запрос
+MAX_ID = 2 ** 63 - 1
+# Имена, совпадающие с адресами users/me/ и users/bulk/
+RESERVED_USERNAMES = ('me', 'bulk')
+
 
 class UserCreateSerializer(serializers.ModelSerializer):
-    """ Сериализатор создания класса пользователь """
+    """ Сериализатор создания класса пользователь.
+    Уникальность username и email проверяется одним запросом в validate,
+    поэтому автоматические UniqueValidator полей не используются """
+    username = serializers.RegexField(max_length=150, regex=r'^[\w.@+-]+$')
+    email = serializers.EmailField(max_length=254)
 
     class Meta:
         model = User
         fields = ('username', 'email')
 
     def validate(self, attrs):
-        """Запрещает пользователям присваивать себе имя me
-        и использовать повторные username и email."""
-        if attrs.get('username') == 'me':
+        """Запрещает пользователям присваивать себе имена me и bulk,
+        занятые адресами API, и использовать повторные username и email."""
+        if attrs.get('username') in RESERVED_USERNAMES:
             raise serializers.ValidationError(
-                'Использовать имя me запрещено'
-            )
-        if User.objects.filter(username=attrs.get('username')):
-            raise serializers.ValidationError(
-                'Пользователь с таким username уже существует'
-            )
-        if User.objects.filter(email=attrs.get('email')):
-            raise serializers.ValidationError(
-                'Пользователь с таким email уже существует'
+                f'Использовать имя {attrs["username"]} запрещено'
             )
+        self.check_collisions(attrs)
         return attrs
 
+    def check_collisions(self, attrs):
+        """ Одним запросом ищет пользователей с тем же username или email
+        и сообщает, какое из полей занято """
+        username, email = attrs['username'], attrs['email']
+        errors = {}
+        for existing_username, existing_email in User.objects.filter(
+            Q(username=username) | Q(email=email)
+        ).values_list('username', 'email')[:2]:
+            if existing_username == username:
+                errors['username'] = ['Пользователь с таким username уже существует']
+            if existing_email == email:
+                errors['email'] = ['Пользователь с таким email уже существует']
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    def create(self, validated_data):
+        """ Создаёт пользователя одним INSERT. Если username или email успели занять
+        после проверки, ошибку уникальности отдаёт ограничение в базе.
+        INSERT выполняется в точке сохранения, чтобы после ошибки внешняя
+        транзакция осталась рабочей для повторной проверки """
+        try:
+            with transaction.atomic():
+                return User.objects.create(**validated_data)
+        except IntegrityError:
+            self.check_collisions(validated_data)
+            raise
+
 
 class UserReceiveTokenSerializer(serializers.Serializer):
     """ Сериализатор получения JWT-токена """
@@ -48,6 +88,11 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ("username", "email", "first_name", "last_name", "bio", "role")
 
+    def validate_username(self, value):
+        if value in RESERVED_USERNAMES:
+            raise serializers.ValidationError(f'Использовать имя {value} запрещено')
+        return value
+
 
 class CategorySerializer(serializers.ModelSerializer):
     """ Сериализатор класса Category """
@@ -108,18 +153,31 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Review
-        fields = ('id', 'text', 'author', 'score', 'pub_date')
+        fields = ('id', 'text', 'author', 'score', 'pub_date', 'comments_count')
+
+    def update(self, instance, validated_data):
+        """ Сохраняет только изменённые поля, чтобы не затереть
+        счётчик комментариев, обновлённый параллельным запросом """
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=validated_data.keys())
+        return instance
+
+
+class TitleShortSerializer(serializers.ModelSerializer):
+    """ Краткий сериализатор класса Title для лент отзывов """
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name')
+
 
-    def validate(self, data):
-        """ Запрещает пользователям оставлять повторные отзывы """
-        if self.context.get('request').method == 'POST':
-            author = self.context.get('request').user
-            title_id = self.context.get('view').kwargs.get('title_id')
-            if Review.objects.filter(author=author, title=title_id).exists():
-                raise serializers.ValidationError(
-                    'Вы уже оставляли отзыв на это произведение'
-                )
-        return data
+class ReviewFeedSerializer(ReviewSerializer):
+    """ Сериализатор отзывов в ленте по всем произведениям """
+    title = TitleShortSerializer(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('title',)
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -129,3 +187,242 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date')
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """ Список объектов для массового создания.
+    Связанные объекты загружаются одним запросом на весь список,
+    а объекты вставляются через bulk_create в одной транзакции """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > BULK_MAX_ITEMS:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'За один запрос можно создать не более {BULK_MAX_ITEMS} объектов'
+                ]
+            })
+        items = [item for item in data if isinstance(item, Mapping)] if isinstance(data, list) else []
+        self.prefetch(items)
+        return super().to_internal_value(data)
+
+    def prefetch(self, items):
+        """ Загружает одним запросом связанные объекты элементов списка """
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        with transaction.atomic():
+            instances = model.objects.bulk_create(
+                model(**attrs) for attrs in validated_data
+            )
+            self.after_bulk_create(instances)
+        return instances
+
+    def after_bulk_create(self, instances):
+        """ Обновляет денормализованные данные в той же транзакции.
+        bulk_create не отправляет сигналы post_save """
+
+
+class BulkReviewListSerializer(BulkListSerializer):
+    """ Список отзывов для массового создания """
+
+    def prefetch(self, items):
+        """ Загружает произведения и произведения, на которые автор уже написал отзыв.
+        Некорректные id пропускаются, ошибку по ним вернёт поле title """
+        title = self.context.get('title')
+        if title is not None:
+            self.titles = {title.pk}
+        else:
+            title_ids = set()
+            for item in items:
+                try:
+                    title_id = int(item.get('title'))
+                except (TypeError, ValueError, OverflowError):
+                    continue
+                if 0 < title_id <= MAX_ID:
+                    title_ids.add(title_id)
+            self.titles = set(
+                Title.objects.filter(pk__in=title_ids).values_list('pk', flat=True)
+            ) if title_ids else set()
+        self.reviewed = set(
+            Review.objects.filter(
+                author=self.context['request'].user.pk, title__in=self.titles
+            ).values_list('title_id', flat=True)
+        ) if self.titles else set()
+
+    def create(self, validated_data):
+        """ Создаёт отзывы и, если база не вернула их id,
+        подгружает их одним запросом по уникальной паре автор-произведение """
+        reviews = super().create(validated_data)
+        if all(review.pk is not None for review in reviews):
+            return reviews
+        pairs = [(review.author_id, review.title_id) for review in reviews]
+        created = {
+            (review.author_id, review.title_id): review
+            for review in Review.objects.select_related('author').filter(
+                author__in={author_id for author_id, _ in pairs},
+                title__in={title_id for _, title_id in pairs}
+            )
+        }
+        return [created[pair] for pair in pairs]
+
+
+class BulkCommentListSerializer(BulkListSerializer):
+    """ Список комментариев к одному обзору для массового создания """
+
+    def after_bulk_create(self, comments):
+        """ Увеличивает счётчик комментариев обзора одним запросом на весь список.
+        Если база не вернула id комментариев, выбирает их в той же транзакции:
+        это последние комментарии обзора, запись в SQLite идёт последовательно """
+        if not comments:
+            return
+        review = self.context['review']
+        Review.objects.filter(pk=review.pk).update(
+            comments_count=F('comments_count') + len(comments)
+        )
+        if any(comment.pk is None for comment in comments):
+            ids = Comment.objects.filter(review=review).order_by('-pk').values_list('pk', flat=True)
+            for comment, pk in zip(comments, reversed(ids[:len(comments)])):
+                comment.pk = pk
+
+
+class BulkAuthorSerializerMixin:
+    """ Автором всех элементов становится текущий пользователь """
+
+    def validate(self, attrs):
+        attrs['author'] = as_model(self.context['request'].user)
+        return attrs
+
+
+class ReviewBulkSerializer(BulkAuthorSerializerMixin, serializers.ModelSerializer):
+    """ Сериализатор массового создания отзывов """
+    author = serializers.StringRelatedField(read_only=True)
+    title = serializers.IntegerField(source='title_id', required=False, min_value=1, max_value=MAX_ID)
+
+    class Meta:
+        model = Review
+        fields = ('id', 'text', 'author', 'score', 'pub_date', 'title')
+        list_serializer_class = BulkReviewListSerializer
+
+    def validate(self, attrs):
+        """ Проверяет произведение и запрещает повторные отзывы,
+        в том числе внутри одного списка """
+        attrs = super().validate(attrs)
+        title = self.context.get('title')
+        title_id = title.pk if title is not None else attrs.get('title_id')
+        if title_id is None:
+            raise serializers.ValidationError({'title': ['Обязательное поле.']})
+        if title_id not in self.parent.titles:
+            raise serializers.ValidationError({'title': ['Произведение не найдено']})
+        if title_id in self.parent.reviewed:
+            raise serializers.ValidationError(DUPLICATE_REVIEW_MESSAGE)
+        self.parent.reviewed.add(title_id)
+        attrs['title_id'] = title_id
+        return attrs
+
+
+class CommentBulkSerializer(BulkAuthorSerializerMixin, serializers.ModelSerializer):
+    """ Сериализатор массового создания комментариев """
+    author = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'text', 'author', 'pub_date')
+        list_serializer_class = BulkCommentListSerializer
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        attrs['review'] = self.context['review']
+        return attrs
+
+
+class BulkUserListSerializer(BulkListSerializer):
+    """ Список пользователей для массового создания """
+
+    def prefetch(self, items):
+        """ Одним запросом находит занятые username и email из списка """
+        usernames = {str(item['username']) for item in items if item.get('username')}
+        emails = {str(item['email']) for item in items if item.get('email')}
+        existing = User.objects.filter(
+            Q(username__in=usernames) | Q(email__in=emails)
+        ).values_list('username', 'email') if usernames or emails else ()
+        self.taken_usernames = set()
+        self.taken_emails = set()
+        for username, email in existing:
+            self.taken_usernames.add(username)
+            self.taken_emails.add(email)
+
+
+class UserBulkSerializer(serializers.ModelSerializer):
+    """ Сериализатор массового создания пользователей """
+    username = serializers.RegexField(max_length=150, regex=r'^[\w.@+-]+$')
+    email = serializers.EmailField(max_length=254)
+
+    class Meta:
+        model = User
+        fields = ("username", "email", "first_name", "last_name", "bio", "role")
+        list_serializer_class = BulkUserListSerializer
+
+    def validate(self, attrs):
+        """ Запрещает имена me и bulk и занятые username и email, в том числе внутри одного списка """
+        errors = {}
+        if attrs['username'] in RESERVED_USERNAMES:
+            errors['username'] = [f'Использовать имя {attrs["username"]} запрещено']
+        elif attrs['username'] in self.parent.taken_usernames:
+            errors['username'] = ['Пользователь с таким username уже существует']
+        if attrs['email'] in self.parent.taken_emails:
+            errors['email'] = ['Пользователь с таким email уже существует']
+        if errors:
+            raise serializers.ValidationError(errors)
+        self.parent.taken_usernames.add(attrs['username'])
+        self.parent.taken_emails.add(attrs['email'])
+        # bulk_create не вызывает User.save()
+        attrs['username_lower'] = attrs['username'].lower()
+        return attrs
+
+
+class BulkUserRoleListSerializer(BulkListSerializer):
+    """ Список новых ролей пользователей """
+
+    def prefetch(self, items):
+        """ Загружает пользователей из списка одним запросом """
+        usernames = {str(item['username']) for item in items if item.get('username')}
+        self.users = {
+            user.username: user
+            for user in User.objects.filter(username__in=usernames).only('id', 'username', 'role')
+        } if usernames else {}
+        self.changed = set()
+
+    def create(self, validated_data):
+        """ Меняет роли одним bulk_update и отзывает токены пользователей,
+        чья роль изменилась, чтобы новая роль действовала сразу.
+        bulk_update не отправляет сигналы post_save """
+        users, changed = [], []
+        for attrs in validated_data:
+            user = attrs['user']
+            if user.role != attrs['role']:
+                user.role = attrs['role']
+                changed.append(user)
+            users.append(user)
+        with transaction.atomic():
+            User.objects.bulk_update(changed, ('role',))
+            revoke_tokens([user.pk for user in changed])
+        return users
+
+
+class UserRoleBulkSerializer(serializers.Serializer):
+    """ Сериализатор массовой смены ролей пользователей """
+    username = serializers.CharField(max_length=150)
+    role = serializers.ChoiceField(choices=UserRoles.choices())
+
+    class Meta:
+        list_serializer_class = BulkUserRoleListSerializer
+
+    def validate(self, attrs):
+        user = self.parent.users.get(attrs['username'])
+        if user is None:
+            raise serializers.ValidationError({'username': ['Пользователь с таким username не найден']})
+        if user.pk in self.parent.changed:
+            raise serializers.ValidationError({'username': ['Пользователь указан в списке повторно']})
+        self.parent.changed.add(user.pk)
+        attrs['user'] = user
+        return attrs
@@ -0,0 +1,73 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Comment, Review
+
+from .authentication import revoke_tokens
+from .events import publish_event
+from .serializers import CommentSerializer, ReviewSerializer
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def publish_after_commit(event, title_id, data):
+    """ Публикует событие после фиксации транзакции.
+    Ошибка публикации не должна ломать запись в базу """
+    def publish():
+        try:
+            publish_event(event, title_id, data)
+        except Exception:
+            logger.exception('Не удалось опубликовать событие %s', event)
+    transaction.on_commit(publish)
+
+
+def publish_reviews_created(reviews):
+    """ Публикует события о новых отзывах. Вызывается и для отзывов,
+    созданных через bulk_create, который не отправляет post_save """
+    for review in reviews:
+        publish_after_commit('review', review.title_id, ReviewSerializer(review).data)
+
+
+def publish_comments_created(comments):
+    """ Публикует события о новых комментариях, в том числе созданных через bulk_create """
+    for comment in comments:
+        data = dict(CommentSerializer(comment).data, review_id=comment.review_id)
+        publish_after_commit('comment', comment.review.title_id, data)
+
+
+@receiver(post_save, sender=Review)
+def publish_review_created(sender, instance, created, **kwargs):
+    """ Публикует событие о новом отзыве """
+    if created:
+        publish_reviews_created([instance])
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_created(sender, instance, created, **kwargs):
+    """ Публикует событие о новом комментарии """
+    if created:
+        publish_comments_created([instance])
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_claims_change(sender, instance, created, **kwargs):
+    """ Отзывает токены пользователя, если изменились данные, хранящиеся в токене.
+    Если пользователь был загружен не полностью, токены отзываются на всякий случай """
+    claims = instance.get_token_claims()
+    if not created and claims != getattr(instance, '_loaded_token_claims', None):
+        revoke_tokens([instance.pk])
+        # Иначе следующий save() запишет в базу старую версию токенов
+        instance.refresh_from_db(fields=('token_version',))
+    instance._loaded_token_claims = claims
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    """ Отзывает токены удалённого пользователя """
+    revoke_tokens([instance.pk])
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.sqlite3.base import SQLiteCursorWrapper
+
+logger = logging.getLogger(__name__)
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDERS = re.compile(r'\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+_write_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """ Нормализует SQL: литералы и параметры заменяются на ?, списки
+    параметров IN (...) сворачиваются, поэтому запросы, которые отличаются
+    только значениями, получают один отпечаток """
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = PLACEHOLDERS.sub('(...)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def explain(connection, sql, params):
+    """ План запроса: EXPLAIN QUERY PLAN для SQLite, EXPLAIN для других баз.
+    Выполняется курсором драйвера, минуя обёртки execute_wrapper """
+    if connection.vendor == 'sqlite':
+        cursor, prefix = SQLiteCursorWrapper(connection.connection), 'EXPLAIN QUERY PLAN '
+    else:
+        cursor, prefix = connection.connection.cursor(), 'EXPLAIN '
+    try:
+        cursor.execute(prefix + sql, params)
+        if connection.vendor == 'sqlite':
+            return [row[-1] for row in cursor.fetchall()]
+        return [' '.join(str(value) for value in row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def write_record(record):
+    path = settings.SLOW_QUERY_LOG_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    with _write_lock, open(path, 'a', encoding='utf-8') as log:
+        log.write(line)
+
+
+class SlowQueryLog:
+    """ Обёртка для connection.execute_wrapper: запросы дольше
+    SLOW_QUERY_THRESHOLD миллисекунд записываются строкой JSON
+    в SLOW_QUERY_LOG_FILE с представлением, отпечатком и планом запроса """
+
+    def __init__(self, request):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= settings.SLOW_QUERY_THRESHOLD:
+                self.log(context['connection'], sql, params, many, duration)
+
+    def log(self, connection, sql, params, many, duration):
+        plan = None
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            try:
+                plan = explain(connection, sql, params)
+            except Exception:
+                logger.warning('Не удалось получить план запроса', exc_info=True)
+        match = self.request.resolver_match
+        record = {
+            'time': time.time(),
+            'view': match.view_name if match else self.request.path,
+            'method': self.request.method,
+            'database': connection.alias,
+            'duration_ms': round(duration, 2),
+            'fingerprint': fingerprint(sql),
+            'sql': sql,
+            'plan': plan,
+        }
+        logger.warning('Медленный запрос %.1f мс в %s: %s', duration, record['view'], record['fingerprint'])
+        write_record(record)
+
+
+def read_log(path):
+    """ Записи журнала медленных запросов, повреждённые строки пропускаются """
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def aggregate(records):
+    """ Сводка по отпечаткам: число запросов, суммарное и максимальное время,
+    представления и последний план """
+    summary = {}
+    for record in records:
+        item = summary.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': set(), 'plan': None,
+        })
+        item['count'] += 1
+        item['total_ms'] += record['duration_ms']
+        item['max_ms'] = max(item['max_ms'], record['duration_ms'])
+        item['views'].add(record['view'])
+        item['plan'] = record['plan'] or item['plan']
+    for item in summary.values():
+        item['avg_ms'] = item['total_ms'] / item['count']
+        item['views'] = sorted(item['views'])
+    return list(summary.values())
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from reviews.models import Title
+
+from .events import GLOBAL_CHANNEL, get_broadcaster, title_channel
+
+GLOBAL_STREAM_PATH = re.compile(r'^/api/v1/events/$')
+TITLE_STREAM_PATH = re.compile(r'^/api/v1/titles/(?P<title_id>\d+)/events/$')
+
+
+def format_event(message):
+    """ Форматирует событие по протоколу Server-Sent Events """
+    data = json.dumps(message['data'], cls=JSONEncoder, ensure_ascii=False)
+    event_id = f'{message["event"]}-{message["data"].get("id")}'
+    return f'id: {event_id}\nevent: {message["event"]}\ndata: {data}\n\n'.encode()
+
+
+async def send_plain_response(send, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def stream_events(channel, receive, send):
+    """ Отдаёт клиенту события канала, пока тот не отключится.
+    Если событий нет, раз в EVENTS_KEEPALIVE секунд отправляет комментарий,
+    чтобы прокси не закрывали соединение """
+    subscription = get_broadcaster().subscribe(channel)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+        while not disconnected.done():
+            next_event = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait(
+                (next_event, disconnected),
+                timeout=settings.EVENTS_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if next_event in done:
+                body = format_event(next_event.result())
+            else:
+                next_event.cancel()
+                if disconnected in done:
+                    break
+                body = b': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        subscription.close()
+        disconnected.cancel()
+
+
+async def event_stream_application(scope, receive, send):
+    """ ASGI-приложение потоков событий: общего и по произведению """
+    if scope['method'] != 'GET':
+        return await send_plain_response(send, 405, b'{"detail": "Method not allowed."}')
+    match = TITLE_STREAM_PATH.match(scope['path'])
+    if match is None:
+        return await stream_events(GLOBAL_CHANNEL, receive, send)
+    title_id = int(match.group('title_id'))
+    if not await sync_to_async(Title.objects.filter(pk=title_id).exists)():
+        return await send_plain_response(send, 404, b'{"detail": "Not found."}')
+    return await stream_events(title_channel(title_id), receive, send)
+
+
+class EventStreamRouter:
+    """ Отдаёт запросы к потокам событий асинхронному приложению,
+    остальные запросы передаёт Django """
+
+    def __init__(self, application):
+        self.application = application
+
+    def is_stream(self, scope):
+        return scope['type'] == 'http' and (
+            GLOBAL_STREAM_PATH.match(scope['path'])
+            or TITLE_STREAM_PATH.match(scope['path'])
+        )
+
+    async def __call__(self, scope, receive, send):
+        if self.is_stream(scope):
+            return await event_stream_application(scope, receive, send)
+        return await self.application(scope, receive, send)
@@ -0,0 +1,87 @@
+import hashlib
+import math
+import time
+from collections.abc import Mapping
+
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 20
+LOCK_RETRY_DELAY = 0.001
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """ Ограничение частоты запросов по алгоритму token bucket.
+    Корзина вмещает столько запросов, сколько указано в ставке, и равномерно
+    пополняется за её период. В кэше хранится только остаток и время обновления,
+    поэтому проверка не обращается к базе данных.
+    Корзины хранятся в отдельном кэше throttle и не вытесняют версии токенов.
+    Чтение и запись корзины выполняются под блокировкой cache.add. Запрос,
+    пришедший, пока корзину обновляет другой запрос, немного ждёт блокировку;
+    если она так и не освободилась, запрос пропускается без списания """
+    cache = caches['throttle']
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        lock = f'{self.key}:lock'
+        if not self.acquire(lock):
+            return True
+        try:
+            return self.take_token()
+        finally:
+            self.cache.delete(lock)
+
+    def acquire(self, lock):
+        """ Пытается взять блокировку корзины, ожидая её освобождения """
+        for attempt in range(LOCK_ATTEMPTS):
+            if self.cache.add(lock, True, LOCK_TIMEOUT):
+                return True
+            time.sleep(LOCK_RETRY_DELAY)
+        return False
+
+    def take_token(self):
+        """ Пополняет корзину за прошедшее время и забирает из неё один запрос """
+        self.now = self.timer()
+        refill_rate = self.num_requests / self.duration
+        tokens, updated = self.cache.get(self.key, (self.num_requests, self.now))
+        tokens = min(self.num_requests, tokens + (self.now - updated) * refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+            self.wait_time = None
+        else:
+            self.wait_time = (1 - tokens) / refill_rate
+        self.cache.set(self.key, (tokens, self.now), math.ceil(self.duration))
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """ Ограничивает запросы регистрации и получения токена с одного IP.
+    IP берётся из X-Forwarded-For только за NUM_PROXIES доверенными прокси """
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class AuthUsernameThrottle(TokenBucketThrottle):
+    """ Ограничивает запросы регистрации и получения токена для одного username.
+    Username берётся из тела запроса до валидации сериализатором """
+    scope = 'auth_username'
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, Mapping):
+            return None
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        ident = hashlib.sha1(username.lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,88 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Замеры текущего запроса, их создаёт ServerTimingMiddleware
+current_timing = contextvars.ContextVar('request_timing', default=None)
+# Не считать обращения к кэшу, например внутри get_many, который вызывает get
+_cache_counting = contextvars.ContextVar('cache_counting', default=True)
+
+
+class RequestTiming:
+    """ Время запроса по фазам, время и число SQL-запросов, попадания в кэш """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.db_time = 0.0
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """ Обёртка для connection.execute_wrapper: считает SQL-запросы и их время """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 2),
+            'db_ms': round(self.db_time * 1000, 2),
+            'queries': self.queries,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in self.phases.items()},
+        }
+
+    def server_timing(self):
+        """ Значение заголовка Server-Timing """
+        metrics = [
+            f'total;dur={self.total * 1000:.2f}',
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+        ]
+        metrics.extend(f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.phases.items())
+        metrics.append(f'cache;desc="hits={self.cache_hits} misses={self.cache_misses}"')
+        return ', '.join(metrics)
+
+
+@contextmanager
+def phase(name):
+    """ Засчитывает время блока в фазу name текущего запроса """
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+    with timing.phase(name):
+        yield
+
+
+def record_cache_lookup(hits, misses):
+    timing = current_timing.get()
+    if timing is not None and _cache_counting.get():
+        timing.cache_hits += hits
+        timing.cache_misses += misses
+
+
+@contextmanager
+def cache_counting_disabled():
+    token = _cache_counting.set(False)
+    try:
+        yield
+    finally:
+        _cache_counting.reset(token)
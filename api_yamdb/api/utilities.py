@@ -1,11 +1,11 @@
-from django.core.mail import send_mail
+from .mail import mail_queue
 
 
 def sent_confirmation_code(email: str, confirmation_code: str) -> None:
-    """ Oтправляет на почту пользователя код подтверждения."""
-    send_mail(
+    """ Ставит в очередь отправки письмо с кодом подтверждения."""
+    mail_queue.enqueue(
         subject="Код подтверждения вашего аккаунта",
         message=f"Ваш код подтверждения: {confirmation_code}",
         from_email=None,
-        recipient_list=(email,),
+        recipient_list=[email],
     )
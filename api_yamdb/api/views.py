@@ -1,40 +1,55 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
+from django.db import IntegrityError, transaction
 from django.db.models import Avg
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, mixins, status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.settings import api_settings
 
 from api import serializers
 from reviews.models import Category, Genre, Review, Title
 
-from .filters import TitleFilter
-from .mixins import CreateListDestroyViewSet
+from .authentication import RoleAccessToken, as_model
+from .filters import TitleFilter, UsernameSearchFilter
+from .mixins import (BulkCreateMixin, CreateListDestroyViewSet,
+                     TimedListMixin, TimedRetrieveMixin)
+from .pagination import ReviewFeedPagination
 from .permissions import (AnonimReadOnly,
                           IsAuthorOrIsModeratorOrIsAdminOrIsSuperUserOnly,
+                          IsModeratorOrIsAdminOrIsSuperUserOnly,
                           IsSuperUserOrIsAdminOnly)
+from .signals import publish_comments_created, publish_reviews_created
+from .throttling import AuthIPThrottle, AuthUsernameThrottle
+from .timing import phase
 from .utilities import sent_confirmation_code
+from .writer import save_serializer
 
 User = get_user_model()
 
+REVIEW_FIELDS = ('id', 'text', 'score', 'pub_date', 'title', 'comments_count')
+COMMENT_FIELDS = ('id', 'text', 'pub_date', 'review')
+
 
 class UserCreateViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     """ Вьюсет для создания объекта класса User """
     serializer_class = serializers.UserCreateSerializer
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
+    throttle_classes = (AuthIPThrottle, AuthUsernameThrottle)
 
     def create(self, request, *args, **kwargs):
         """ Создаёт объект модели User и отправляет на почту
         код подтверждения """
         serializer = serializers.UserCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user, _ = User.objects.get_or_create(**serializer.validated_data)
+        user = serializer.save()
         confirmation_code = default_token_generator.make_token(user)
         sent_confirmation_code(
             email=user.email,
@@ -48,6 +63,7 @@ class UserReceiveTokenViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     serializer_class = serializers.UserReceiveTokenSerializer
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
+    throttle_classes = (AuthIPThrottle, AuthUsernameThrottle)
 
     def create(self, request, *args, **kwargs):
         serializer = serializers.UserReceiveTokenSerializer(data=request.data)
@@ -59,18 +75,40 @@ class UserReceiveTokenViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
         if not default_token_generator.check_token(user, confirmation_code):
             message = {'confirmation_code': 'Код подтверждения невалиден'}
             return Response(message, status=status.HTTP_400_BAD_REQUEST)
-        message = {'token': str(AccessToken.for_user(user))}
+        message = {'token': str(RoleAccessToken.for_user(user))}
         return Response(message, status=status.HTTP_200_OK)
 
 
-class UserViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+class UserViewSet(TimedListMixin, BulkCreateMixin, mixins.CreateModelMixin,
+                  mixins.ListModelMixin, viewsets.GenericViewSet):
     """ Вьюсет для обьектов модели User """
     queryset = User.objects.all()
     serializer_class = serializers.UserSerializer
+    bulk_serializer_class = serializers.UserBulkSerializer
     permission_classes = (IsSuperUserOrIsAdminOnly,)
     pagination_class = PageNumberPagination
-    filter_backends = (filters.SearchFilter, )
-    search_fields = ('username',)
+    filter_backends = (UsernameSearchFilter,)
+
+    # Маршруты действий регистрируются в алфавитном порядке имён методов,
+    # поэтому users/bulk/ проверяется раньше, чем users/{username}/
+    @action(detail=False,
+            methods=['POST'],
+            url_path='bulk',
+            url_name='bulk')
+    def bulk(self, request):
+        """ Создаёт список пользователей для администраторов и суперпользователей """
+        return self.perform_bulk_create(request)
+
+    @action(detail=False,
+            methods=['PATCH'],
+            url_path='bulk/roles',
+            url_name='bulk_roles')
+    def bulk_roles(self, request):
+        """ Меняет роли списку пользователей для администраторов и суперпользователей """
+        serializer = serializers.UserRoleBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False,
             methods=['GET', 'PATCH', 'DELETE'],
@@ -97,12 +135,14 @@ class UserViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.Gener
             url_path=r'me',
             url_name='me')
     def user_by_me(self, request):
-        """ Позволяет авторизованному пользователю получить данные о себе и изменит их """
-        user = self.request.user
+        """ Позволяет авторизованному пользователю получить данные о себе и изменит их.
+        Пользователь из токена не содержит всех полей, поэтому он загружается из базы.
+        Свою роль пользователь изменить не может """
+        user = get_object_or_404(User, pk=self.request.user.pk)
         if self.request.method == 'PATCH':
             serializer = serializers.UserSerializer(user, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            serializer.save(role=user.role)
             return Response(serializer.data, status=status.HTTP_200_OK)
         serializer = serializers.UserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -120,7 +160,7 @@ class GenreViewSet(CreateListDestroyViewSet):
     serializer_class = serializers.GenreSerializer
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(TimedListMixin, TimedRetrieveMixin, viewsets.ModelViewSet):
     """ Вьюсет для объекта модели Title """
     queryset = Title.objects.annotate(rating=Avg('reviews__score'))
     serializer_class = serializers.TitleSerializer
@@ -136,9 +176,10 @@ class TitleViewSet(viewsets.ModelViewSet):
         return serializers.TitleSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(TimedListMixin, TimedRetrieveMixin, BulkCreateMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = serializers.ReviewSerializer
+    bulk_serializer_class = serializers.ReviewBulkSerializer
     permission_classes = (IsAuthorOrIsModeratorOrIsAdminOrIsSuperUserOnly,)
     pagination_class = PageNumberPagination
 
@@ -148,16 +189,54 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return get_object_or_404(Title, pk=title_id)
 
     def get_queryset(self):
-        """ Возвращает queryset c отзывами для текущего произведения """
-        return self.get_title().reviews.all()
+        """ Возвращает queryset c отзывами для текущего произведения.
+        Автор подгружается тем же запросом, из его полей выбирается только username """
+        return self.get_title().reviews.select_related('author').only(
+            *REVIEW_FIELDS, 'author__username'
+        )
 
     def perform_create(self, serializer):
-        """ """
-        serializer.save(author=self.request.user, title=self.get_title())
+        """ Создаёт отзыв текущего пользователя одним INSERT.
+        Повторный отзыв отсекает ограничение unique_author_title, а несуществующее
+        произведение — внешний ключ, который в режиме autocommit проверяется
+        при фиксации самой вставки. Произведение запрашивается только если
+        вставка не удалась; вставка идёт в точке сохранения, чтобы этот запрос
+        был возможен и внутри внешней транзакции (ATOMIC_REQUESTS).
+        Внутри внешней транзакции отложенный внешний ключ SQLite проверился бы
+        только при её фиксации, поэтому он проверяется явно до выхода из точки
+        сохранения. При SINGLE_WRITER вставку выполняет поток-писатель """
+        title_id = self.kwargs.get('title_id')
+        connection = transaction.get_connection()
+        nested = connection.in_atomic_block
+        try:
+            with transaction.atomic():
+                save_serializer(serializer, author=as_model(self.request.user), title_id=title_id)
+                if nested:
+                    connection.check_constraints(table_names=[Review._meta.db_table])
+        except IntegrityError:
+            if not Title.objects.filter(pk=title_id).exists():
+                raise Http404
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [serializers.DUPLICATE_REVIEW_MESSAGE]
+            })
+
+    @action(detail=False,
+            methods=['POST'],
+            permission_classes=(IsModeratorOrIsAdminOrIsSuperUserOnly,),
+            url_path='bulk',
+            url_name='bulk')
+    def bulk(self, request, title_id=None):
+        """ Создаёт список отзывов на текущее произведение
+        для модераторов, администраторов и суперпользователей """
+        return self.perform_bulk_create(request, title=self.get_title())
+
+    def bulk_created(self, reviews):
+        publish_reviews_created(reviews)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(TimedListMixin, TimedRetrieveMixin, BulkCreateMixin, viewsets.ModelViewSet):
     serializer_class = serializers.CommentSerializer
+    bulk_serializer_class = serializers.CommentBulkSerializer
     permission_classes = (IsAuthorOrIsModeratorOrIsAdminOrIsSuperUserOnly,)
     pagination_class = PageNumberPagination
 
@@ -167,13 +246,86 @@ class CommentViewSet(viewsets.ModelViewSet):
         return get_object_or_404(Review, pk=review_id)
 
     def get_queryset(self):
-        """ Возвращает queryset c комментариями для текущего комментария """
-        return self.get_review().comments.all()
+        """ Возвращает queryset c комментариями для текущего обзора.
+        Автор подгружается тем же запросом, из его полей выбирается только username """
+        return self.get_review().comments.select_related('author').only(
+            *COMMENT_FIELDS, 'author__username'
+        )
 
     def perform_create(self, serializer):
         """ Создает комментарий для текущего отзыва,
-        где автором является текущий пользователь """
-        serializer.save(
-            author=self.request.user,
+        где автором является текущий пользователь.
+        При SINGLE_WRITER вставку и обновление счётчика выполняет поток-писатель """
+        save_serializer(
+            serializer,
+            author=as_model(self.request.user),
             review=self.get_review()
         )
+
+    @action(detail=False,
+            methods=['POST'],
+            permission_classes=(IsModeratorOrIsAdminOrIsSuperUserOnly,),
+            url_path='bulk',
+            url_name='bulk')
+    def bulk(self, request, title_id=None, review_id=None):
+        """ Создаёт список комментариев к текущему обзору
+        для модераторов, администраторов и суперпользователей """
+        return self.perform_bulk_create(request, review=self.get_review())
+
+    def bulk_created(self, comments):
+        publish_comments_created(comments)
+
+
+class ReviewFeedMixin:
+    """ Лента отзывов по всем произведениям: произведение и автор
+    подгружаются тем же запросом, страницы выдаются по курсору """
+    serializer_class = serializers.ReviewFeedSerializer
+    pagination_class = ReviewFeedPagination
+
+    def get_feed_queryset(self):
+        return Review.objects.select_related('author', 'title').only(
+            *REVIEW_FIELDS, 'author__username', 'title__name'
+        )
+
+
+class GlobalReviewViewSet(ReviewFeedMixin, BulkCreateMixin, viewsets.GenericViewSet):
+    """ Вьюсет для отзывов сразу на несколько произведений """
+    queryset = Review.objects.all()
+    bulk_serializer_class = serializers.ReviewBulkSerializer
+
+    @action(detail=False,
+            methods=['GET'],
+            permission_classes=(AnonimReadOnly,),
+            url_path='latest',
+            url_name='latest')
+    def latest(self, request):
+        """ Возвращает последние отзывы по всем произведениям """
+        with phase('query'):
+            page = self.paginate_queryset(self.get_feed_queryset())
+        with phase('serialize'):
+            data = self.get_serializer(page, many=True).data
+        return self.get_paginated_response(data)
+
+    @action(detail=False,
+            methods=['POST'],
+            permission_classes=(IsModeratorOrIsAdminOrIsSuperUserOnly,),
+            url_path='bulk',
+            url_name='bulk')
+    def bulk(self, request):
+        """ Создаёт список отзывов на разные произведения, произведение
+        указывается в поле title каждого отзыва """
+        return self.perform_bulk_create(request)
+
+    def bulk_created(self, reviews):
+        publish_reviews_created(reviews)
+
+
+class UserReviewViewSet(TimedListMixin, ReviewFeedMixin, mixins.ListModelMixin,
+                        viewsets.GenericViewSet):
+    """ Вьюсет для ленты отзывов одного пользователя """
+    permission_classes = (AnonimReadOnly,)
+
+    def get_queryset(self):
+        """ Возвращает отзывы пользователя, выбираемые по индексу (author, pub_date) """
+        author = get_object_or_404(User.objects.only('id'), username=self.kwargs.get('username'))
+        return self.get_feed_queryset().filter(author=author)
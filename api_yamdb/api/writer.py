@@ -0,0 +1,142 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+
+class WriteNotStarted(APIException):
+    """ Запись не дождалась потока-писателя и отменена: в базе её нет """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Запись не выполнена: очередь записей перегружена, повторите запрос'
+    default_code = 'write_not_started'
+
+
+class WritePending(APIException):
+    """ Запись уже выполняется и может зафиксироваться позже: результат неизвестен """
+    status_code = status.HTTP_202_ACCEPTED
+    default_detail = 'Запись ещё выполняется, её результат пока неизвестен'
+    default_code = 'write_pending'
+
+
+class WriteQueue:
+    """ Очередь записей, которые выполняет один поток-писатель.
+    Поток забирает из очереди до SINGLE_WRITER_BATCH_SIZE накопившихся записей
+    и выполняет их в одной транзакции, каждую в своей точке сохранения:
+    ошибка одной записи откатывает только её. Если транзакция не фиксируется
+    (например, из-за отложенной проверки внешнего ключа в SQLite), записи
+    пакета выполняются заново по одной. Поэтому функция записи должна
+    выдерживать повторный запуск после отката. Результат возвращается через Future """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stats = {'batches': 0, 'writes': 0, 'retried_batches': 0}
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.work, name='db-writer', daemon=True)
+                self.thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """ Ставит запись в очередь и возвращает Future с её результатом """
+        future = Future()
+        self.start()
+        self.queue.put((future, func, args, kwargs))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """ Выполняет запись в потоке-писателе и ждёт результат.
+        Исключение записи пробрасывается вызывающему. Если за
+        SINGLE_WRITER_TIMEOUT запись не началась, она отменяется (WriteNotStarted);
+        если уже началась, она может ещё зафиксироваться (WritePending) """
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return future.result(settings.SINGLE_WRITER_TIMEOUT)
+        except TimeoutError:
+            if future.cancel():
+                raise WriteNotStarted
+            if not future.done():
+                raise WritePending
+        return future.result()
+
+    def collect(self):
+        batch = [self.queue.get()]
+        while len(batch) < settings.SINGLE_WRITER_BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return [job for job in batch if job[0].set_running_or_notify_cancel()]
+
+    def work(self):
+        while True:
+            batch = self.collect()
+            if not batch:
+                continue
+            close_old_connections()
+            try:
+                outcomes = self.write_batch(batch)
+            except IntegrityError:
+                logger.info('Пакет из %s записей не зафиксирован, записи выполняются по одной', len(batch))
+                with self.lock:
+                    self.stats['retried_batches'] += 1
+                outcomes = [self.write_one(job) for job in batch]
+            except Exception as error:
+                logger.exception('Ошибка пакета записей')
+                outcomes = [error] * len(batch)
+            with self.lock:
+                self.stats['batches'] += 1
+                self.stats['writes'] += len(batch)
+            for (future, *_), outcome in zip(batch, outcomes):
+                if isinstance(outcome, BaseException):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+    def write_one(self, job):
+        try:
+            return self.write_batch([job])[0]
+        except Exception as error:
+            return error
+
+    def write_batch(self, batch):
+        """ Выполняет записи пакета в одной транзакции. Возвращает результат
+        или исключение каждой записи; результаты становятся видны после фиксации """
+        outcomes = []
+        with transaction.atomic():
+            for _, func, args, kwargs in batch:
+                try:
+                    with transaction.atomic():
+                        outcomes.append(func(*args, **kwargs))
+                except Exception as error:
+                    outcomes.append(error)
+        return outcomes
+
+
+write_queue = WriteQueue()
+
+
+def write(func, *args, **kwargs):
+    """ Выполняет запись через поток-писатель, если включён SINGLE_WRITER,
+    иначе сразу в текущем потоке """
+    if settings.SINGLE_WRITER:
+        return write_queue.run(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+
+def save_serializer(serializer, **kwargs):
+    """ Создаёт объект сериализатора через write().
+    При повторном запуске после отката сбрасывается объект прошлой попытки """
+    def save():
+        serializer.instance = None
+        return serializer.save(**kwargs)
+    return write(save)
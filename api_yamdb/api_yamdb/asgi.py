@@ -2,6 +2,9 @@
 ASGI config for YaMDb project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to the Server-Sent Events streams (``/api/v1/events/`` and
+``/api/v1/titles/<id>/events/``) are served natively by ``api.streams``,
+everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -13,4 +16,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.streams import EventStreamRouter  # noqa: E402
+
+application = EventStreamRouter(django_application)
@@ -1,5 +1,6 @@
 import os
 from datetime import timedelta
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -15,6 +16,24 @@ ALLOWED_HOSTS = ['*']
 
 # Application definition
 
+# Приложения и middleware админки. Профиль API_ONLY=true для серверов,
+# которые обслуживают только /api/v1/, не загружает их вовсе. Старт это
+# не ускоряет (см. benchmarks/startup.py): основное время уходит на DRF
+SITE_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
+SITE_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+API_ONLY = os.getenv('API_ONLY', 'false').lower() == 'true'
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -23,7 +42,6 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'djoser',
     'django_filters',
     'api',
     'reviews',
@@ -31,15 +49,21 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in SITE_APPS]
+    MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in SITE_MIDDLEWARE]
+
 ROOT_URLCONF = 'api_yamdb.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
@@ -68,9 +92,50 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Прагмы выполняются на каждом новом соединении с SQLite (api.database).
+# SQLITE_TUNING=false оставляет настройки SQLite по умолчанию
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', 'true').lower() == 'true'
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),
+    'temp_store': os.getenv('SQLITE_TEMP_STORE', 'memory'),
+} if SQLITE_TUNING else {}
+
+# Один поток-писатель на процесс (api.writer): отзывы и комментарии
+# записываются пакетами до SINGLE_WRITER_BATCH_SIZE в одной транзакции
+SINGLE_WRITER = os.getenv('SINGLE_WRITER', 'false').lower() == 'true'
+SINGLE_WRITER_BATCH_SIZE = 100
+SINGLE_WRITER_TIMEOUT = 30
+
+# Реплика для чтения: файл, который обновляет команда refresh_replica.
+# Безопасные запросы читают реплику (api.database.ReplicaRouter), а в течение
+# DATABASE_REPLICA_STICKY секунд после записи клиент читает основную базу.
+# Отметка о записи хранится в кэше default: с LocMemCache она действует только
+# в процессе, который выполнил запись, для нескольких воркеров нужен общий кэш
+DATABASE_REPLICA = None
+DATABASE_REPLICA_STICKY = int(os.getenv('DB_REPLICA_STICKY', 5))
+if os.getenv('DB_REPLICA_PATH'):
+    DATABASE_REPLICA = 'replica'
+    DATABASES[DATABASE_REPLICA] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_REPLICA_PATH'),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'PRAGMAS': {
+            **{name: value for name, value in SQLITE_PRAGMAS.items() if name != 'journal_mode'},
+            'query_only': 1,
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['api.database.ReplicaRouter']
+    MIDDLEWARE.append('api.middleware.ReplicaRoutingMiddleware')
+
 AUTH_USER_MODEL = 'users.User'
 
 # Password validation
@@ -114,6 +179,16 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 DEFAULT_FROM_EMAIL = 'YaMDB@mail.ru'
 
+# Письма отправляет фоновый поток (api.mail.MailQueue), при EMAIL_QUEUE_EAGER — сразу
+EMAIL_QUEUE_EAGER = os.getenv('EMAIL_QUEUE_EAGER', 'false').lower() == 'true'
+EMAIL_QUEUE_MAX_RETRIES = 3
+EMAIL_QUEUE_RETRY_DELAY = 5
+EMAIL_QUEUE_SHUTDOWN_TIMEOUT = 10
+# Письма, пришедшие за EMAIL_BATCH_WINDOW секунд, отправляются через одно соединение
+EMAIL_BATCH_WINDOW = 0.2
+EMAIL_BATCH_SIZE = 100
+EMAIL_DEAD_LETTER_FILE = os.path.join(BASE_DIR, 'run', 'mail', 'dead_letter.log')
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer', ),
@@ -121,10 +196,99 @@ SIMPLE_JWT = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': '60/min',
+        'auth_username': '10/min',
+    },
+    # Число доверенных прокси перед приложением. Без него DRF берёт IP для
+    # ограничения частоты из X-Forwarded-For, который присылает сам клиент
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
+}
+
+# MessagePack и CBOR для внутренних клиентов: выбираются заголовками Accept
+# и Content-Type, если установлены пакеты msgpack и cbor2. Браузеры и клиенты
+# без явного Accept получают JSON
+for module, renderer, parser in (
+    ('msgpack', 'api.renderers.MessagePackRenderer', 'api.parsers.MessagePackParser'),
+    ('cbor2', 'api.renderers.CBORRenderer', 'api.parsers.CBORParser'),
+):
+    if find_spec(module):
+        REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] += (renderer,)
+        REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] += (parser,)
+
+# Кэш default хранит версии JWT-токенов, кэш throttle — корзины ограничения
+# частоты запросов, чтобы они не вытесняли друг друга.
+# Для нескольких процессов нужен общий бэкенд, например api.cache.PyMemcacheCache.
+# Бэкенды из api.cache считают попадания в кэш для заголовка Server-Timing
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'api.cache.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+    'throttle': {
+        'BACKEND': os.getenv('THROTTLE_CACHE_BACKEND', os.getenv('CACHE_BACKEND', 'api.cache.LocMemCache')),
+        'LOCATION': os.getenv('THROTTLE_CACHE_LOCATION', os.getenv('CACHE_LOCATION', 'throttle')),
+        'KEY_PREFIX': 'throttle',
+    },
 }
+
+# Сколько секунд версия JWT-токенов пользователя хранится в кэше.
+# Сама версия хранится в базе, кэш только избавляет от запроса к ней.
+# Это и есть предел устаревания: с LocMemCache у каждого воркера свой кэш,
+# и отзыв токенов доходит до других воркеров не позже чем через столько секунд.
+# Столько же может прожить версия, прочитанная до фиксации отзыва
+TOKEN_VERSION_CACHE_TIMEOUT = int(os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', 5))
+
+# Заголовок Server-Timing и журнал api.timing для запросов с этим префиксом
+SERVER_TIMING_PATH_PREFIX = '/api/v1/'
+
+# Метрики запросов для Prometheus (/metrics). Воркерам gunicorn нужен общий
+# METRICS_DIR: каждый процесс сохраняет туда свои счётчики, /metrics суммирует
+# файлы всех процессов, в том числе завершившихся. Сервер каталог не очищает:
+# перед запуском gunicorn выполните manage.py clear_metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+
+# Профилирование запросов администраторов по заголовку X-Profile: 1.
+# Хранятся последние PROFILE_KEEP профилей, скачать их можно по /profiles/<id>
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'run', 'profiles'))
+PROFILE_KEEP = 50
+PROFILE_TEXT_LIMIT = 40
+
+# Журнал медленных SQL-запросов, отчёт по нему строит команда slow_queries.
+# SLOW_QUERY_THRESHOLD в миллисекундах, пустое значение отключает журнал
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100) or 'inf')
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', os.path.join(BASE_DIR, 'run', 'slow_queries.log'))
+if SLOW_QUERY_THRESHOLD != float('inf'):
+    MIDDLEWARE.insert(1, 'api.middleware.SlowQueryMiddleware')
+
+# ASGI
+
+# Асинхронные GET-представления каталога (api.async_urls) для запуска под ASGI
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'false').lower() == 'true'
+
+# Server-Sent Events
+
+# api.events.LocalBackend доставляет события в пределах одного процесса,
+# api.events.UnixSocketBackend — всем воркерам сервера через EVENTS_SOCKET_DIR
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'api.events.LocalBackend')
+EVENTS_SOCKET_DIR = os.getenv('EVENTS_SOCKET_DIR', os.path.join(BASE_DIR, 'run', 'events'))
+EVENTS_QUEUE_SIZE = 100
+EVENTS_KEEPALIVE = 15
@@ -13,16 +13,26 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
+from django.conf import settings
 from django.urls import include, path
 from django.views.generic import TemplateView
 
+from api.metrics import metrics_view
+from api.profiling import profile_view
+
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path(
         'redoc/',
         TemplateView.as_view(template_name='redoc.html'),
         name='redoc'
     ),
-    path('api/v1/', include('api.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    path('profiles/<str:profile_id>', profile_view, name='profile'),
+    path('api/v1/', include('api.async_urls' if settings.ASYNC_READ_VIEWS else 'api.urls')),
 ]
+
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 22:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def fill_comments_count(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    counts = Comment.objects.filter(
+        review=OuterRef('pk')
+    ).order_by().values('review').annotate(total=Count('pk')).values('total')
+    Review.objects.filter(pk__in=Comment.objects.values('review')).update(
+        comments_count=Subquery(counts)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_alter_comment_review'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_comments_count, migrations.RunPython.noop),
+    ]
@@ -111,6 +111,7 @@ class Review(models.Model):
                                                     MaxValueValidator(10, message='Введенная оценка выше допустимой')])
     pub_date = models.DateTimeField(auto_now_add=True, verbose_name='Время публикации', db_index=True)
     title = models.ForeignKey(Title, on_delete=models.CASCADE, verbose_name='Произведение', related_name='reviews')
+    comments_count = models.PositiveIntegerField(verbose_name='Количество комментариев', default=0, editable=False)
 
     class Meta:
         verbose_name = 'Обзор'
@@ -122,6 +123,10 @@ class Review(models.Model):
                 name='unique_author_title'
             ),
         )
+        indexes = (
+            models.Index(fields=('pub_date', 'id'), name='review_pub_date_id_idx'),
+            models.Index(fields=('author', 'pub_date'), name='review_author_pub_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:50]
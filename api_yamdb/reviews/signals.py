@@ -0,0 +1,22 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Comment, Review
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    """ Увеличивает счётчик комментариев обзора при создании комментария """
+    if created:
+        Review.objects.filter(pk=instance.review_id).update(
+            comments_count=F('comments_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    """ Уменьшает счётчик комментариев обзора при удалении комментария """
+    Review.objects.filter(pk=instance.review_id, comments_count__gt=0).update(
+        comments_count=F('comments_count') - 1
+    )
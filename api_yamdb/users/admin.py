@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import User
+from .search import search_users
 
 
 @admin.register(User)
@@ -18,5 +19,14 @@ class UserAdmin(admin.ModelAdmin):
     )
     empty_value_display = 'значение отсутствует'
     list_editable = ('role',)
-    list_filter = ('username',)
-    search_fields = ('username', 'role')
+    list_filter = ('role',)
+    search_fields = ('username',)
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """ Ищет по username так же, как API: «=name» — точное совпадение,
+        «^name» — начало username, иначе вхождение без учёта регистра """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return search_users(queryset, search_term), False
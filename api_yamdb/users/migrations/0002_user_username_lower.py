@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+def fill_username_lower(apps, schema_editor):
+    # lower() в SQLite меняет регистр только латиницы, поэтому значения
+    # считаются в Python так же, как в User.save()
+    User = apps.get_model('users', 'User')
+    users = []
+    for user in User.objects.only('id', 'username').iterator(chunk_size=2000):
+        user.username_lower = user.username.lower()
+        users.append(user)
+        if len(users) == 2000:
+            User.objects.bulk_update(users, ('username_lower',))
+            users = []
+    User.objects.bulk_update(users, ('username_lower',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='username_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150, verbose_name='Имя пользователя в нижнем регистре'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_username_lower, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,8 @@ from django.db import models
 
 from .enums import UserRoles
 
+TOKEN_CLAIM_FIELDS = ('username', 'role', 'is_staff', 'is_superuser', 'is_active')
+
 
 class User(AbstractUser):
     """Класс пользователей."""
@@ -13,6 +15,10 @@ class User(AbstractUser):
                                 db_index=True,
                                 validators=[RegexValidator(regex=r'^[\w.@+-]+$',
                                                            message='Имя пользователя содержит недопустимый символ')])
+    username_lower = models.CharField(max_length=150,
+                                      verbose_name='Имя пользователя в нижнем регистре',
+                                      db_index=True,
+                                      editable=False)
     email = models.EmailField(max_length=254,
                               unique=True,
                               verbose_name='Электронная почта пользователя')
@@ -37,6 +43,12 @@ class User(AbstractUser):
         default=UserRoles.user.name
     )
 
+    token_version = models.PositiveIntegerField(
+        verbose_name='Версия токенов',
+        default=0,
+        editable=False
+    )
+
     USERNAME_FIELD = 'username'
 
     class Meta:
@@ -47,6 +59,26 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username}"
 
+    def save(self, *args, **kwargs):
+        """ Заполняет username_lower для поиска по началу username без учёта регистра """
+        self.username_lower = self.username.lower()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'username' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'username_lower'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """ Запоминает загруженные из базы данные, которые попадают в JWT-токен """
+        user = super().from_db(db, field_names, values)
+        if set(TOKEN_CLAIM_FIELDS).issubset(field_names):
+            user._loaded_token_claims = user.get_token_claims()
+        return user
+
+    def get_token_claims(self):
+        """ Данные пользователя, которые хранятся в JWT-токене """
+        return {field: getattr(self, field) for field in TOKEN_CLAIM_FIELDS}
+
     @property
     def is_admin(self):
         return self.role == UserRoles.admin.name
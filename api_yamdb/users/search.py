@@ -0,0 +1,23 @@
+from django.db.models import Q
+
+# Символ, который больше любого символа строки: диапазон [prefix, prefix + PREFIX_UPPER_BOUND)
+# содержит все строки, начинающиеся с prefix
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+def prefix_range(field, prefix):
+    """ Условие «поле начинается с prefix» в виде диапазона.
+    В отличие от LIKE, сравнение диапазоном использует B-tree индекс поля """
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_UPPER_BOUND})
+
+
+def search_users(queryset, term):
+    """ Ищет пользователей по username:
+    «=name» — точное совпадение по уникальному индексу,
+    «^name» — начало username без учёта регистра по индексу username_lower,
+    «name» — вхождение без учёта регистра, как раньше; этот поиск просматривает всю таблицу """
+    if term.startswith('='):
+        return queryset.filter(username=term[1:])
+    if term.startswith('^'):
+        return queryset.filter(prefix_range('username_lower', term[1:].lower()))
+    return queryset.filter(username__icontains=term)
@@ -0,0 +1,182 @@
+"""Сравнение синхронных представлений под WSGI и асинхронных под ASGI.
+
+Запросы подаются прямо в WSGI/ASGI-приложение внутри процесса, без сети:
+под WSGI — из пула потоков размером --concurrency, как у потокового
+сервера, под ASGI — из --concurrency корутин одного цикла событий.
+
+    python -m benchmarks.asgi_vs_wsgi --concurrency 100 --requests 3000
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks.common import (ROOT_DIR, prepare_database, setup_django,
+                               summarize, write_report)
+
+
+def build_paths(dataset, count, seed=0):
+    """ Смешанная нагрузка на чтение каталога """
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        title_id = rng.choice(dataset['titles'])
+        review_id = rng.choice(dataset['reviews'])
+        paths.append(rng.choice((
+            '/api/v1/titles/',
+            f'/api/v1/titles/?genre={rng.choice(dataset["genres"])}',
+            f'/api/v1/titles/{title_id}/',
+            f'/api/v1/titles/{title_id}/reviews/',
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+            '/api/v1/genres/',
+            '/api/v1/categories/',
+        )))
+    return paths
+
+
+def wsgi_environ(path):
+    url = urlsplit(path)
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def run_wsgi(paths, concurrency):
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+
+    def call(path):
+        statuses = []
+        started = time.perf_counter()
+        response = application(wsgi_environ(path), lambda status, headers, exc_info=None: statuses.append(status))
+        b''.join(response)
+        response.close()
+        return time.perf_counter() - started, statuses[0].startswith('200')
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, paths))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for latency, _ in results], elapsed,
+                     errors=sum(1 for _, ok in results if not ok), concurrency=concurrency)
+
+
+def asgi_scope(path):
+    url = urlsplit(path)
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url.path,
+        'raw_path': url.path.encode(),
+        'query_string': url.query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+def run_asgi(paths, concurrency):
+    from api_yamdb.asgi import application
+
+    async def call(path):
+        statuses = []
+        request = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if request:
+                return request.pop()
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        started = time.perf_counter()
+        await application(asgi_scope(path), receive, send)
+        return time.perf_counter() - started, statuses[0] == 200
+
+    async def worker(queue, results):
+        while queue:
+            results.append(await call(queue.pop()))
+
+    async def main():
+        queue, results = list(reversed(paths)), []
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(queue, results) for _ in range(concurrency)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    return summarize([latency for latency, _ in results], elapsed,
+                     errors=sum(1 for _, ok in results if not ok), concurrency=concurrency)
+
+
+def run_mode(args):
+    setup_django(args.db)
+    with open(args.dataset) as file:
+        dataset = json.load(file)
+    paths = build_paths(dataset, args.requests)
+    runner = run_wsgi if args.mode == 'wsgi' else run_asgi
+    runner(paths[:min(len(paths), args.concurrency)], args.concurrency)
+    print(json.dumps(runner(paths, args.concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--output')
+    parser.add_argument('--mode', choices=('wsgi', 'asgi'), help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--dataset', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        return run_mode(args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'db.sqlite3')
+        dataset_path = os.path.join(directory, 'dataset.json')
+        with open(dataset_path, 'w') as file:
+            json.dump(prepare_database(db_path, args.scale), file)
+        results = {}
+        # Каждый режим запускается в отдельном процессе: выбор маршрутов
+        # (ASYNC_READ_VIEWS) делается при импорте URLConf
+        for mode, async_views in (('wsgi', 'false'), ('asgi', 'true')):
+            env = dict(os.environ, ASYNC_READ_VIEWS=async_views)
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.asgi_vs_wsgi', '--mode', mode, '--db', db_path,
+                 '--dataset', dataset_path, '--requests', str(args.requests),
+                 '--concurrency', str(args.concurrency)],
+                cwd=ROOT_DIR, env=env, check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+    write_report('asgi_vs_wsgi', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
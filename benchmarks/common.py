@@ -0,0 +1,125 @@
+"""Общие функции бенчмарков: настройка Django, наполнение базы, статистика."""
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(ROOT_DIR, 'api_yamdb')
+
+
+def setup_django(db_path=None):
+    """ Настраивает Django на базу бенчмарка """
+    for path in (ROOT_DIR, PROJECT_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    if db_path:
+        os.environ['BENCHMARK_DB'] = db_path
+    import django
+    django.setup()
+
+
+def prepare_database(db_path, scale=1):
+    """ Создаёт свежую базу и наполняет её данными заданного масштаба """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    setup_django(db_path)
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return seed(scale)
+
+
+def seed(scale=1):
+    """ Наполняет базу: на единицу масштаба 100 пользователей, 200 произведений,
+    по 10 отзывов на произведение и по 2 комментария на отзыв """
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+
+    from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                                Title)
+
+    User = get_user_model()
+    users_count, titles_count = 100 * scale, 200 * scale
+    reviews_per_title, comments_per_review = 10, 2
+    with transaction.atomic():
+        User.objects.bulk_create(
+            User(
+                username=f'user{number}', username_lower=f'user{number}',
+                email=f'user{number}@yamdb.fake', password='!'
+            )
+            for number in range(users_count)
+        )
+        users = list(User.objects.order_by('id'))
+        Category.objects.bulk_create(
+            Category(name=f'Категория {number}', slug=f'category-{number}') for number in range(10)
+        )
+        categories = list(Category.objects.order_by('id'))
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {number}', slug=f'genre-{number}') for number in range(20)
+        )
+        genres = list(Genre.objects.order_by('id'))
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {number}', year=1950 + number % 70,
+                  description='Описание произведения', category=categories[number % len(categories)])
+            for number in range(titles_count)
+        )
+        titles = list(Title.objects.order_by('id'))
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genres[(title.pk + shift) % len(genres)])
+            for title in titles for shift in (0, 7)
+        )
+        Review.objects.bulk_create(
+            Review(title=title, author=users[(title.pk + shift) % len(users)],
+                   text='Текст отзыва ' * 10, score=1 + (title.pk + shift) % 10,
+                   comments_count=comments_per_review)
+            for title in titles for shift in range(reviews_per_title)
+        )
+        reviews = list(Review.objects.order_by('id').values_list('id', flat=True))
+        Comment.objects.bulk_create(
+            Comment(review_id=review_id, author=users[(review_id + shift) % len(users)],
+                    text='Текст комментария')
+            for review_id in reviews for shift in range(comments_per_review)
+        )
+    return {
+        'users': [user.username for user in users],
+        'titles': [title.pk for title in titles],
+        'reviews': reviews,
+        'categories': [category.slug for category in categories],
+        'genres': [genre.slug for genre in genres],
+    }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, errors=0, **extra):
+    """ Считает пропускную способность и перцентили задержки в миллисекундах """
+    latencies = sorted(latencies)
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(1000 * percentile(latencies, 0.50), 2),
+        'p95_ms': round(1000 * percentile(latencies, 0.95), 2),
+        'p99_ms': round(1000 * percentile(latencies, 0.99), 2),
+    }
+    result.update(extra)
+    return result
+
+
+def write_report(name, results, output=None):
+    """ Печатает результаты и, если указан путь, сохраняет их в JSON """
+    report = {'benchmark': name, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w') as file:
+            file.write(text)
+    print(text)
+    return report
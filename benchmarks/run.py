@@ -0,0 +1,380 @@
+"""Бенчмарк всех маршрутов API: пропускная способность, задержка и SQL-запросы.
+
+Наполняет базу данными заданного масштаба и выполняет по --requests запросов
+каждого сценария: анонимные и авторизованные чтения списков и объектов,
+создание и изменение. Запросы идут через тестовый клиент Django или, с флагом
+--server, в запущенный локально runserver. Число SQL-запросов берётся
+из заголовка Server-Timing. Результат сохраняется в JSON вместе с коммитом,
+а --baseline сравнивает его с предыдущим прогоном.
+
+    python -m benchmarks.run --scale 2 --requests 200 --output before.json
+    python -m benchmarks.run --scale 2 --requests 200 --baseline before.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, namedtuple
+
+from benchmarks.common import (PROJECT_DIR, ROOT_DIR, prepare_database,
+                               summarize, write_report)
+
+Scenario = namedtuple('Scenario', 'name route method auth status build')
+
+QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class Fixtures:
+    """ Пользователи, токены и объекты, на которые ссылаются сценарии """
+
+    def __init__(self, dataset, requests):
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.tokens import default_token_generator
+
+        from reviews.models import Comment, Review
+
+        User = get_user_model()
+        self.dataset = dataset
+        self.rng = random.Random(0)
+        self.admin = User.objects.create(
+            username='bench-admin', email='bench-admin@yamdb.fake', role='admin'
+        )
+        User.objects.bulk_create(
+            User(username=f'bench-role{number}', username_lower=f'bench-role{number}',
+                 email=f'bench-role{number}@yamdb.fake')
+            for number in range(10)
+        )
+        # Автор отзывов, созданных списком, — модератор из запроса,
+        # поэтому у каждого запроса свой модератор
+        User.objects.bulk_create(
+            User(username=f'bench-moderator{number}', username_lower=f'bench-moderator{number}',
+                 email=f'bench-moderator{number}@yamdb.fake', role='moderator')
+            for number in range(requests)
+        )
+        self.moderator_reviews = {}
+        self.users = {user.username: user for user in User.objects.all()}
+        self.tokens = {}
+        self.confirmation_codes = [
+            (username, default_token_generator.make_token(self.users[username]))
+            for username in dataset['users'][:requests]
+        ]
+        self.review_titles = dict(Review.objects.values_list('id', 'title_id'))
+        self.comments = list(Comment.objects.values_list('review__title_id', 'review_id', 'id'))
+        reviewed = set(Review.objects.values_list('author__username', 'title_id'))
+        self.free_pairs = (
+            (username, title_id)
+            for title_id in dataset['titles'] for username in dataset['users']
+            if (username, title_id) not in reviewed
+        )
+
+    def token(self, username):
+        from api.authentication import RoleAccessToken
+
+        if username not in self.tokens:
+            self.tokens[username] = str(RoleAccessToken.for_user(self.users[username]))
+        return self.tokens[username]
+
+    def user(self):
+        return self.rng.choice(self.dataset['users'])
+
+    def title(self):
+        return self.rng.choice(self.dataset['titles'])
+
+    def review(self):
+        review_id = self.rng.choice(self.dataset['reviews'])
+        return self.review_titles[review_id], review_id
+
+    def comment(self):
+        return self.rng.choice(self.comments)
+
+    def moderator_titles(self, number, count):
+        """ Модератор запроса number и count произведений, на которые он ещё не писал отзыв """
+        reviewed = self.moderator_reviews.setdefault(number, set())
+        titles = self.rng.sample([title for title in self.dataset['titles'] if title not in reviewed], count)
+        reviewed.update(titles)
+        return f'bench-moderator{number}', titles
+
+    def free_pair(self):
+        return next(self.free_pairs)
+
+
+def build_scenarios(fixtures):
+    """ Сценарии по маршрутам API. Сценарии удаления используют объекты,
+    созданные предыдущими сценариями с тем же номером запроса """
+    f = fixtures
+    reviews_url = '/api/v1/titles/{}/reviews/'
+    comments_url = '/api/v1/titles/{}/reviews/{}/comments/'
+
+    def review_create(number):
+        username, title_id = f.free_pair()
+        return reviews_url.format(title_id), {'text': 'Отзыв', 'score': 7}, username
+
+    def reviews_bulk(number):
+        username, titles = f.moderator_titles(number, 5)
+        items = [{'text': 'Отзыв', 'score': 5, 'title': title_id} for title_id in titles]
+        return '/api/v1/reviews/bulk/', items, username
+
+    def review_bulk(number):
+        username, (title_id,) = f.moderator_titles(number, 1)
+        return f'{reviews_url.format(title_id)}bulk/', [{'text': 'Отзыв', 'score': 5}], username
+
+    def comment_path():
+        return comments_url.format(*f.review())
+
+    return [
+        Scenario('api-root', 'api:api-root', 'GET', 'bench-admin', 200,
+                 lambda number: ('/api/v1/', None)),
+        Scenario('signup', 'api:signup', 'POST', None, 200,
+                 lambda number: ('/api/v1/auth/signup/', {
+                     'username': f'bench-signup{number}', 'email': f'bench-signup{number}@yamdb.fake'})),
+        Scenario('token', 'api:token', 'POST', None, 200,
+                 lambda number: ('/api/v1/auth/token/', dict(zip(
+                     ('username', 'confirmation_code'),
+                     f.confirmation_codes[number % len(f.confirmation_codes)])))),
+        Scenario('user-list', 'api:user-list', 'GET', 'bench-admin', 200,
+                 lambda number: (f'/api/v1/users/?page={1 + number % 5}', None)),
+        Scenario('user-search', 'api:user-list', 'GET', 'bench-admin', 200,
+                 lambda number: (f'/api/v1/users/?search=user{number % 10}', None)),
+        Scenario('user-search-prefix', 'api:user-list', 'GET', 'bench-admin', 200,
+                 lambda number: (f'/api/v1/users/?search=^user{number % 10}', None)),
+        Scenario('user-create', 'api:user-list', 'POST', 'bench-admin', 201,
+                 lambda number: ('/api/v1/users/', {
+                     'username': f'bench-user{number}', 'email': f'bench-user{number}@yamdb.fake'})),
+        Scenario('user-bulk', 'api:user-bulk', 'POST', 'bench-admin', 201,
+                 lambda number: ('/api/v1/users/bulk/', [
+                     {'username': f'bench-bulk{number}-{item}', 'email': f'bench-bulk{number}-{item}@yamdb.fake'}
+                     for item in range(10)])),
+        Scenario('user-bulk-roles', 'api:user-bulk_roles', 'PATCH', 'bench-admin', 200,
+                 lambda number: ('/api/v1/users/bulk/roles/', [
+                     {'username': f'bench-role{item}', 'role': ('user', 'moderator')[number % 2]}
+                     for item in range(10)])),
+        Scenario('user-me', 'api:user-me', 'GET', 'user0', 200,
+                 lambda number: ('/api/v1/users/me/', None)),
+        Scenario('user-me-patch', 'api:user-me', 'PATCH', 'user0', 200,
+                 lambda number: ('/api/v1/users/me/', {'bio': f'bio {number}'})),
+        Scenario('user-detail', 'api:user-get_user', 'GET', 'bench-admin', 200,
+                 lambda number: (f'/api/v1/users/{f.user()}/', None)),
+        Scenario('user-detail-patch', 'api:user-get_user', 'PATCH', 'bench-admin', 200,
+                 lambda number: (f'/api/v1/users/bench-user{number}/', {'bio': 'bio'})),
+        Scenario('user-reviews', 'api:user-review-list', 'GET', None, 200,
+                 lambda number: (f'/api/v1/users/{f.user()}/reviews/', None)),
+        Scenario('category-list', 'api:category-list', 'GET', None, 200,
+                 lambda number: ('/api/v1/categories/', None)),
+        Scenario('category-create', 'api:category-list', 'POST', 'bench-admin', 201,
+                 lambda number: ('/api/v1/categories/', {'name': 'Категория', 'slug': f'bench-{number}'})),
+        Scenario('category-delete', 'api:category-detail', 'DELETE', 'bench-admin', 204,
+                 lambda number: (f'/api/v1/categories/bench-{number}/', None)),
+        Scenario('genre-list', 'api:genre-list', 'GET', None, 200,
+                 lambda number: ('/api/v1/genres/', None)),
+        Scenario('genre-create', 'api:genre-list', 'POST', 'bench-admin', 201,
+                 lambda number: ('/api/v1/genres/', {'name': 'Жанр', 'slug': f'bench-{number}'})),
+        Scenario('genre-delete', 'api:genre-detail', 'DELETE', 'bench-admin', 204,
+                 lambda number: (f'/api/v1/genres/bench-{number}/', None)),
+        Scenario('title-list', 'api:title-list', 'GET', None, 200,
+                 lambda number: (f'/api/v1/titles/?page={1 + number % 5}', None)),
+        Scenario('title-filter', 'api:title-list', 'GET', None, 200,
+                 lambda number: (f'/api/v1/titles/?genre={f.rng.choice(f.dataset["genres"])}', None)),
+        Scenario('title-create', 'api:title-list', 'POST', 'bench-admin', 201,
+                 lambda number: ('/api/v1/titles/', {
+                     'name': f'Произведение {number}', 'year': 2000,
+                     'category': f.dataset['categories'][0], 'genre': f.dataset['genres'][:2]})),
+        Scenario('title-detail', 'api:title-detail', 'GET', None, 200,
+                 lambda number: (f'/api/v1/titles/{f.title()}/', None)),
+        Scenario('title-patch', 'api:title-detail', 'PATCH', 'bench-admin', 200,
+                 lambda number: (f'/api/v1/titles/{f.title()}/', {'description': f'Описание {number}'})),
+        Scenario('reviews-latest', 'api:reviews-latest', 'GET', None, 200,
+                 lambda number: ('/api/v1/reviews/latest/', None)),
+        Scenario('reviews-bulk', 'api:reviews-bulk', 'POST', 'moderator', 201, reviews_bulk),
+        Scenario('review-list', 'api:review-list', 'GET', None, 200,
+                 lambda number: (reviews_url.format(f.title()), None)),
+        Scenario('review-create', 'api:review-list', 'POST', 'author', 201, review_create),
+        Scenario('review-bulk', 'api:review-bulk', 'POST', 'moderator', 201, review_bulk),
+        Scenario('review-detail', 'api:review-detail', 'GET', None, 200,
+                 lambda number: ('/api/v1/titles/{}/reviews/{}/'.format(*f.review()), None)),
+        Scenario('review-patch', 'api:review-detail', 'PATCH', 'bench-admin', 200,
+                 lambda number: ('/api/v1/titles/{}/reviews/{}/'.format(*f.review()), {'text': 'Новый текст'})),
+        Scenario('comment-list', 'api:comment-list', 'GET', None, 200,
+                 lambda number: (comment_path(), None)),
+        Scenario('comment-create', 'api:comment-list', 'POST', 'user0', 201,
+                 lambda number: (comment_path(), {'text': 'Комментарий'})),
+        Scenario('comment-bulk', 'api:comment-bulk', 'POST', 'bench-admin', 201,
+                 lambda number: (f'{comment_path()}bulk/', [{'text': 'Комментарий'}] * 5)),
+        Scenario('comment-detail', 'api:comment-detail', 'GET', None, 200,
+                 lambda number: ('/api/v1/titles/{}/reviews/{}/comments/{}/'.format(*f.comment()), None)),
+    ]
+
+
+def api_routes():
+    """ Имена всех маршрутов api.urls """
+    import api.urls
+    from django.urls import URLResolver
+
+    names = set()
+    patterns = list(api.urls.urlpatterns)
+    while patterns:
+        pattern = patterns.pop()
+        if isinstance(pattern, URLResolver):
+            patterns.extend(pattern.url_patterns)
+        elif pattern.name:
+            names.add(f'api:{pattern.name}')
+    return names
+
+
+class ClientTransport:
+    """ Запросы через тестовый клиент Django в том же процессе """
+
+    def __init__(self):
+        from django.test import Client
+        self.client = Client()
+
+    def request(self, method, path, data, token):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        body = json.dumps(data) if data is not None else ''
+        response = self.client.generic(method, path, body, content_type='application/json', **headers)
+        return response.status_code, response.get('Server-Timing', '')
+
+    def close(self):
+        pass
+
+
+class ServerTransport:
+    """ Запросы по HTTP в runserver, запущенный на базе бенчмарка """
+
+    def __init__(self, db_path):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        self.base_url = f'http://127.0.0.1:{port}'
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='benchmarks.settings', BENCHMARK_DB=db_path,
+                   PYTHONPATH=os.pathsep.join((ROOT_DIR, PROJECT_DIR)))
+        self.process = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'],
+            cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.close()
+                    raise RuntimeError('Не удалось запустить runserver')
+                time.sleep(0.1)
+
+    def request(self, method, path, data, token):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, body, headers, method=method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers.get('Server-Timing', '')
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def run_scenario(transport, fixtures, scenario, requests):
+    latencies, queries, statuses = [], [], Counter()
+    started = time.perf_counter()
+    for number in range(requests):
+        path, data, *author = scenario.build(number)
+        username = author[0] if author else scenario.auth
+        token = fixtures.token(username) if username else None
+        request_started = time.perf_counter()
+        status, server_timing = transport.request(scenario.method, path, data, token)
+        latencies.append(time.perf_counter() - request_started)
+        statuses[status] += 1
+        match = QUERIES.search(server_timing)
+        if match:
+            queries.append(int(match.group(1)))
+    elapsed = time.perf_counter() - started
+    return summarize(
+        latencies, elapsed,
+        errors=requests - statuses[scenario.status],
+        route=scenario.route,
+        method=scenario.method,
+        statuses={str(status): count for status, count in sorted(statuses.items())},
+        queries_mean=round(sum(queries) / len(queries), 2) if queries else None,
+        queries_max=max(queries) if queries else None,
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """ Печатает изменение задержки, пропускной способности и числа запросов к базе """
+    with open(baseline_path) as file:
+        baseline = json.load(file)['results']['scenarios']
+    print(f'{"сценарий":<20} {"p50, мс":>18} {"rps":>18} {"запросов к БД":>16}')
+    for name, current in results['scenarios'].items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        print(f'{name:<20} '
+              f'{before["p50_ms"]:>8} → {current["p50_ms"]:<8} '
+              f'{before["throughput_rps"]:>8} → {current["throughput_rps"]:<8} '
+              f'{before["queries_mean"]!s:>6} → {current["queries_mean"]!s:<6}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=100, help='Запросов на сценарий')
+    parser.add_argument('--server', action='store_true', help='Отправлять запросы в локальный runserver')
+    parser.add_argument('--only', nargs='*', help='Запустить только указанные сценарии')
+    parser.add_argument('--output')
+    parser.add_argument('--baseline', help='JSON предыдущего прогона для сравнения')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'db.sqlite3')
+        dataset = prepare_database(db_path, args.scale)
+        fixtures = Fixtures(dataset, args.requests)
+        scenarios = build_scenarios(fixtures)
+        if args.only:
+            scenarios = [scenario for scenario in scenarios if scenario.name in args.only]
+        transport = ServerTransport(db_path) if args.server else ClientTransport()
+        try:
+            scenario_results = {
+                scenario.name: run_scenario(transport, fixtures, scenario, args.requests)
+                for scenario in scenarios
+            }
+        finally:
+            transport.close()
+    covered = {scenario.route for scenario in build_scenarios(fixtures)}
+    results = {
+        'commit': git_commit(),
+        'transport': 'server' if args.server else 'client',
+        'scale': args.scale,
+        'requests': args.requests,
+        'uncovered_routes': sorted(api_routes() - covered),
+        'scenarios': scenario_results,
+    }
+    write_report('api', results, args.output)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
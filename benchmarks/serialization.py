@@ -0,0 +1,91 @@
+"""Сравнение рендереров и парсеров API на страницах произведений и отзывов.
+
+Данные берутся из сериализаторов API на наполненной базе, страница из
+--page-size объектов рендерится и разбирается --repeat раз каждым кодеком:
+JSON DRF, JSON на orjson и, если установлены msgpack и cbor2, MessagePack и CBOR.
+
+    python -m benchmarks.serialization --page-size 100 --repeat 200
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.common import prepare_database, write_report
+
+
+def build_payloads(page_size):
+    """ Страницы в том виде, в каком их отдаёт API """
+    from django.db.models import Avg
+
+    from api import serializers
+    from reviews.models import Review, Title
+
+    titles = Title.objects.annotate(rating=Avg('reviews__score')).select_related(
+        'category').prefetch_related('genre').order_by('id')[:page_size]
+    reviews = Review.objects.select_related('author').order_by('id')[:page_size]
+    return {
+        'titles': serializers.TitleGETSerializer(titles, many=True).data,
+        'reviews': serializers.ReviewSerializer(reviews, many=True).data,
+    }
+
+
+def build_codecs():
+    """ Пары рендерер и парсер для сравнения, первая — стандартная пара DRF """
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from api import parsers, renderers
+
+    codecs = {
+        'drf-json': (JSONRenderer(), JSONParser()),
+        'fast-json': (renderers.FastJSONRenderer(), parsers.FastJSONParser()),
+    }
+    if renderers.msgpack is not None:
+        codecs['msgpack'] = (renderers.MessagePackRenderer(), parsers.MessagePackParser())
+    if renderers.cbor2 is not None:
+        codecs['cbor'] = (renderers.CBORRenderer(), parsers.CBORParser())
+    return codecs
+
+
+def measure(function, repeat):
+    """ Среднее время вызова в микросекундах """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return round((time.perf_counter() - started) / repeat * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        prepare_database(os.path.join(directory, 'db.sqlite3'), args.scale)
+        payloads = build_payloads(args.page_size)
+    codecs = build_codecs()
+    results = {}
+    for name, data in payloads.items():
+        data = {'count': len(data), 'next': None, 'previous': None, 'results': data}
+        results[name] = {}
+        for codec, (renderer, body_parser) in codecs.items():
+            body = renderer.render(data, renderer.media_type, {})
+            results[name][codec] = {
+                'bytes': len(body),
+                'render_us': measure(lambda: renderer.render(data, renderer.media_type, {}), args.repeat),
+                'parse_us': measure(lambda: body_parser.parse(io.BytesIO(body), renderer.media_type, {}), args.repeat),
+            }
+        baseline = results[name]['drf-json']
+        for stats in results[name].values():
+            stats['render_speedup'] = round(baseline['render_us'] / stats['render_us'], 2)
+            stats['parse_speedup'] = round(baseline['parse_us'] / stats['parse_us'], 2)
+    write_report('serialization', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
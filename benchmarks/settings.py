@@ -0,0 +1,18 @@
+"""Настройки для запуска бенчмарков на отдельной базе."""
+import os
+
+from api_yamdb.settings import *  # noqa: F401,F403
+from api_yamdb.settings import DATABASES, REST_FRAMEWORK
+
+DEBUG = False
+
+# Бенчмарки регистрируют сотни пользователей с одного адреса
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'auth_ip': None, 'auth_username': None},
+}
+EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'
+
+DATABASES['default']['NAME'] = os.environ.get(
+    'BENCHMARK_DB', os.path.join('/tmp', 'yamdb-benchmark.sqlite3')
+)
@@ -0,0 +1,140 @@
+"""Пропускная способность чтения и записи с настройками SQLite по умолчанию и с прагмами.
+
+Запросы подаются прямо в WSGI-приложение из пула потоков размером
+--concurrency: доля --write-ratio запросов создаёт комментарии, остальные
+читают каталог. Профиль default — без прагм и с новым соединением на каждый
+запрос, профиль tuned — SQLITE_PRAGMAS и постоянные соединения.
+
+    python -m benchmarks.sqlite_profile --concurrency 16 --requests 3000
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.asgi_vs_wsgi import build_paths, wsgi_environ
+from benchmarks.common import ROOT_DIR, setup_django, summarize, write_report
+
+PROFILES = {
+    'default': {'SQLITE_TUNING': 'false', 'DB_CONN_MAX_AGE': '0'},
+    'tuned': {'SQLITE_TUNING': 'true', 'DB_CONN_MAX_AGE': '60'},
+}
+
+
+def build_requests(dataset, count, write_ratio, seed=0):
+    """ Смесь чтений каталога и созданий комментариев от случайных пользователей """
+    rng = random.Random(seed)
+    reads = iter(build_paths(dataset, count, seed))
+    requests = []
+    for _ in range(count):
+        path = next(reads)
+        if rng.random() < write_ratio:
+            title_id = rng.choice(dataset['titles'])
+            review_id = rng.choice(dataset['reviews'])
+            path = f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+            requests.append(('POST', path, rng.choice(dataset['users'])))
+        else:
+            requests.append(('GET', path, None))
+    return requests
+
+
+def run_profile(requests, concurrency):
+    from django.contrib.auth import get_user_model
+    from django.core.wsgi import get_wsgi_application
+
+    from api.authentication import RoleAccessToken
+
+    application = get_wsgi_application()
+    tokens = {
+        user.username: str(RoleAccessToken.for_user(user))
+        for user in get_user_model().objects.filter(
+            username__in={username for _, _, username in requests if username}
+        )
+    }
+    body = json.dumps({'text': 'Комментарий из бенчмарка'}).encode()
+
+    def call(request):
+        method, path, username = request
+        environ = wsgi_environ(path)
+        if method == 'POST':
+            environ.update({
+                'REQUEST_METHOD': 'POST',
+                'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': str(len(body)),
+                'HTTP_AUTHORIZATION': f'Bearer {tokens[username]}',
+                'wsgi.input': io.BytesIO(body),
+            })
+        statuses = []
+        started = time.perf_counter()
+        response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        b''.join(response)
+        response.close()
+        return method, time.perf_counter() - started, statuses[0][:1] == '2'
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, requests))
+    elapsed = time.perf_counter() - started
+    report = {}
+    for method, kind in (('GET', 'reads'), ('POST', 'writes')):
+        selected = [(latency, ok) for result_method, latency, ok in results if result_method == method]
+        report[kind] = summarize([latency for latency, _ in selected], elapsed,
+                                 errors=sum(1 for _, ok in selected if not ok))
+    report['concurrency'] = concurrency
+    return report
+
+
+def run_mode(args):
+    setup_django(args.db)
+    with open(args.dataset) as file:
+        dataset = json.load(file)
+    requests = build_requests(dataset, args.requests, args.write_ratio)
+    print(json.dumps(run_profile(requests, args.concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--output')
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--dataset', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.profile:
+        return run_mode(args)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        dataset_path = os.path.join(directory, 'dataset.json')
+        for profile, profile_env in PROFILES.items():
+            # Режим журнала хранится в файле базы, поэтому у каждого профиля своя база
+            db_path = os.path.join(directory, f'{profile}.sqlite3')
+            env = dict(os.environ, **profile_env)
+            subprocess.run(
+                [sys.executable, '-c',
+                 'import json, sys; from benchmarks.common import prepare_database; '
+                 'json.dump(prepare_database(sys.argv[1], int(sys.argv[2])), open(sys.argv[3], "w"))',
+                 db_path, str(args.scale), dataset_path],
+                cwd=ROOT_DIR, env=env, check=True
+            )
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.sqlite_profile', '--profile', profile,
+                 '--db', db_path, '--dataset', dataset_path, '--requests', str(args.requests),
+                 '--concurrency', str(args.concurrency), '--write-ratio', str(args.write_ratio)],
+                cwd=ROOT_DIR, env=env, check=True, capture_output=True, text=True
+            ).stdout
+            results[profile] = json.loads(output.strip().splitlines()[-1])
+    write_report('sqlite_profile', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Время холодного старта и задержка запросов к API для профиля API_ONLY.
+
+Каждый профиль запускается в отдельном процессе --repeat раз:
+    full     — настройки по умолчанию, с админкой, сессиями и сообщениями;
+    api-only — API_ONLY=true, без админки, сессий и сообщений.
+Холодный старт — время от запуска интерпретатора до ответа на первый запрос
+без импорта модулей самого замера, задержка — лёгкие запросы к API после
+прогрева. API_ONLY не ускоряет старт: разница между профилями меньше разброса
+между запусками, основное время уходит на импорт DRF, django-filter и coreapi,
+которые нужны в обоих профилях.
+
+    python -m benchmarks.startup --repeat 5 --requests 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.asgi_vs_wsgi import wsgi_environ
+from benchmarks.common import (ROOT_DIR, prepare_database, setup_django,
+                               summarize, write_report)
+
+START = time.perf_counter()
+
+PROFILES = {
+    'full': {'API_ONLY': 'false'},
+    'api-only': {'API_ONLY': 'true'},
+}
+
+
+def run_profile(args):
+    """ Выполняется в дочернем процессе: замеряет старт и запросы """
+    setup_django(args.db)
+    django_ready = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+
+    from django.contrib.auth import get_user_model
+
+    from api.authentication import RoleAccessToken
+    token = str(RoleAccessToken.for_user(get_user_model().objects.get(username='user0')))
+
+    def call(path, authorization=None):
+        environ = wsgi_environ(path)
+        if authorization:
+            environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        statuses = []
+        started = time.perf_counter()
+        response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        b''.join(response)
+        response.close()
+        return time.perf_counter() - started, statuses[0].startswith('200')
+
+    call('/api/v1/categories/')
+    first_response = time.perf_counter()
+    results = {
+        'modules': len(sys.modules),
+        'setup_ms': round((django_ready - START) * 1000, 2),
+        'first_response_ms': round((first_response - START) * 1000, 2),
+    }
+    for name, path, authorization in (
+        ('anonymous', '/api/v1/categories/', False),
+        ('authenticated', '/api/v1/users/me/', True),
+    ):
+        started = time.perf_counter()
+        calls = [call(path, authorization) for _ in range(args.requests)]
+        results[name] = summarize(
+            [latency for latency, _ in calls], time.perf_counter() - started,
+            errors=sum(1 for _, ok in calls if not ok)
+        )
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Запусков каждого профиля')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--output')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_profile(args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'db.sqlite3')
+        prepare_database(db_path)
+        results = {}
+        for profile, env in PROFILES.items():
+            runs = []
+            for _ in range(args.repeat):
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.startup', '--child', '--db', db_path,
+                     '--requests', str(args.requests)],
+                    cwd=ROOT_DIR, env=dict(os.environ, **env), check=True, capture_output=True, text=True
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            results[profile] = {
+                'modules': runs[0]['modules'],
+                **{
+                    key: round(statistics.median(run[key] for run in runs), 2)
+                    for key in ('setup_ms', 'first_response_ms')
+                },
+                **{
+                    f'{name}_{key}': round(statistics.median(run[name][key] for run in runs), 3)
+                    for name in ('anonymous', 'authenticated') for key in ('mean_ms', 'p50_ms', 'p99_ms')
+                },
+            }
+    write_report('startup', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
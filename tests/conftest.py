@@ -33,4 +33,6 @@ assert get_version() < '3.0.0', 'Пожалуйста, используйте в
 
 pytest_plugins = [
     'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_mail',
+    'tests.fixtures.fixture_cache',
 ]
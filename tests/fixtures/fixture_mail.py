@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_mail_queue(settings):
+    settings.EMAIL_QUEUE_EAGER = True
+    settings.EMAIL_QUEUE_RETRY_DELAY = 0
@@ -1,6 +1,10 @@
 import pytest
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.db import transaction
+
+from api.serializers import UserCreateSerializer
+from api.throttling import LOCK_TIMEOUT, AuthIPThrottle
 
 User = get_user_model()
 
@@ -240,6 +244,11 @@ class Test00UserRegistration:
             f'Проверьте, что при {request_type} запросе `{self.url_signup}` '
             f'нельзя создать пользователя с username = "me" и возвращается статус {code}'
         )
+        response = client.post(self.url_signup, data={'email': valid_email, 'username': 'bulk'})
+        assert response.status_code == code, (
+            f'Проверьте, что при {request_type} запросе `{self.url_signup}` '
+            f'нельзя создать пользователя с username = "bulk" и возвращается статус {code}'
+        )
 
     @pytest.mark.django_db(transaction=True)
     def test_00_registration_same_email_restricted(self, client):
@@ -279,3 +288,87 @@ class Test00UserRegistration:
             f'Проверьте, что при {request_type} запросе `{self.url_signup}` нельзя создать '
             f'пользователя, username которого уже зарегистрирован и возвращается статус {code}'
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_registration_single_query_validation(self, client, django_assert_num_queries):
+        data = {'email': 'single@yamdb.fake', 'username': 'single'}
+        # проверка уникальности, BEGIN точки сохранения и сама вставка
+        with django_assert_num_queries(3):
+            response = client.post(self.url_signup, data=data)
+        assert response.status_code == 200, (
+            f'Проверьте, что POST запрос `{self.url_signup}` проверяет уникальность '
+            f'одним запросом и создаёт пользователя одной вставкой'
+        )
+        with django_assert_num_queries(1):
+            response = client.post(self.url_signup, data={'email': data['email'], 'username': 'other'})
+        assert response.status_code == 400 and set(response.json()) == {'email'}, (
+            f'Проверьте, что при POST запросе `{self.url_signup}` с занятым email '
+            f'ошибка возвращается для поля email'
+        )
+        response = client.post(self.url_signup, data=data)
+        assert set(response.json()) == {'username', 'email'}, (
+            f'Проверьте, что при POST запросе `{self.url_signup}` ошибки возвращаются '
+            f'для всех занятых полей'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_registration_race_in_transaction(self, client, monkeypatch):
+        data = {'email': 'race@yamdb.fake', 'username': 'race'}
+        client.post(self.url_signup, data=data)
+        # username и email заняли между проверкой и вставкой
+        monkeypatch.setattr(UserCreateSerializer, 'validate', lambda serializer, attrs: attrs)
+        with transaction.atomic():
+            response = client.post(self.url_signup, data=data)
+        assert response.status_code == 400 and set(response.json()) == {'username', 'email'}, (
+            f'Проверьте, что при POST запросе `{self.url_signup}` ошибка уникальности '
+            f'из базы возвращается со статусом 400 и внутри внешней транзакции'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_auth_throttled_by_username(self, client, django_assert_num_queries):
+        data = {'username': 'bot', 'confirmation_code': 'wrong'}
+        for _ in range(10):
+            client.post(self.url_token, data=data)
+        with django_assert_num_queries(0):
+            response = client.post(self.url_token, data=data)
+        assert response.status_code == 429, (
+            f'Проверьте, что частые POST запросы `{self.url_token}` для одного username '
+            f'отклоняются без обращения к базе со статусом 429'
+        )
+        response = client.post(self.url_signup, data={'username': 'other', 'email': 'other@yamdb.fake'})
+        assert response.status_code == 200, (
+            'Проверьте, что ограничение по username не затрагивает других пользователей'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_auth_throttled_by_ip(self, client):
+        for number in range(60):
+            client.post(self.url_signup, data={'username': f'bot{number}'},
+                        HTTP_X_FORWARDED_FOR=f'10.0.0.{number}')
+        response = client.post(self.url_signup, data={'username': 'bot', 'email': 'bot@yamdb.fake'},
+                               HTTP_X_FORWARDED_FOR='10.0.1.1')
+        assert response.status_code == 429, (
+            f'Проверьте, что частые POST запросы `{self.url_signup}` с одного IP '
+            f'отклоняются со статусом 429, даже если клиент меняет X-Forwarded-For'
+        )
+        assert 'Retry-After' in response, (
+            'Проверьте, что ответ 429 содержит заголовок Retry-After'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_auth_throttle_lock_held(self, client):
+        key = AuthIPThrottle.cache_format % {'scope': AuthIPThrottle.scope, 'ident': '127.0.0.1'}
+        AuthIPThrottle.cache.add(f'{key}:lock', True, LOCK_TIMEOUT)
+        response = client.post(self.url_signup, data={'username': 'bot'})
+        assert response.status_code != 429, (
+            f'Проверьте, что POST запрос `{self.url_signup}` не отклоняется со статусом 429, '
+            f'пока корзину ограничения частоты обновляет другой запрос'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_00_auth_list_body(self, client):
+        for url in (self.url_signup, self.url_token):
+            response = client.post(url, data=[{'username': 'bot'}], content_type='application/json')
+            assert response.status_code == 400, (
+                f'Проверьте, что POST запрос `{url}` со списком в теле возвращает статус 400'
+            )
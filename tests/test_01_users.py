@@ -1,7 +1,14 @@
+import time
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+
+from api.authentication import get_token_version
+from api.database import read_database
 
-from .common import auth_client, create_users_api
+from .common import auth_client, create_users_api, obtain_token_client
 
 
 class Test01UserAPI:
@@ -116,6 +123,41 @@ class Test01UserAPI:
             'возвращается искомый пользователь со всеми необходимыми полями, включая `bio` и `role`'
         )
 
+    @pytest.mark.django_db(transaction=True)
+    def test_04_03_users_get_search_indexed(self, admin_client, admin, django_assert_num_queries):
+        create_users_api(admin_client)
+        client = obtain_token_client(admin)
+        with django_assert_num_queries(2) as captured:
+            response = client.get('/api/v1/users/?search=^testmo')
+        assert [user['username'] for user in response.json()['results']] == ['TestModer'], (
+            'Проверьте, что GET запрос `/api/v1/users/?search=^{prefix}` ищет пользователей '
+            'по началу username без учёта регистра'
+        )
+        assert all('LIKE' not in query['sql'] for query in captured.captured_queries), (
+            'Проверьте, что поиск пользователей не выполняет LIKE по всей таблице'
+        )
+        response = admin_client.get('/api/v1/users/?search=moder')
+        assert [user['username'] for user in response.json()['results']] == ['TestModer'], (
+            'Проверьте, что GET запрос `/api/v1/users/?search={text}` по-прежнему ищет '
+            'вхождение в username без учёта регистра'
+        )
+        response = admin_client.get('/api/v1/users/?search=^moder')
+        assert response.json()['results'] == [], (
+            'Проверьте, что поиск `/api/v1/users/?search=^{prefix}` ищет только начало username'
+        )
+        response = admin_client.get('/api/v1/users/?search==TestUser')
+        assert [user['username'] for user in response.json()['results']] == ['TestUser'], (
+            'Проверьте, что GET запрос `/api/v1/users/?search=={username}` ищет точное совпадение username'
+        )
+        response = admin_client.get('/api/v1/users/?search==testuser')
+        assert response.json()['results'] == [], (
+            'Проверьте, что точный поиск `/api/v1/users/?search=={username}` учитывает регистр'
+        )
+        plan = str(get_user_model().objects.filter(username_lower__gte='test', username_lower__lt='tesu').explain())
+        assert 'INDEX' in plan, (
+            'Проверьте, что для поля username_lower создан индекс'
+        )
+
     @pytest.mark.django_db(transaction=True)
     def test_04_01_users_get_admin_only(self, user_client):
         url = '/api/v1/users/'
@@ -571,3 +613,172 @@ class Test01UserAPI:
             'Проверьте, что при PATCH запросе `/api/v1/users/me/`, '
             'пользователь с ролью user не может сменить себе роль'
         )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_01_users_token_without_user_query(self, admin, django_assert_num_queries):
+        client = obtain_token_client(admin)
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/users/')
+        assert response.status_code == 200, (
+            'Проверьте, что токен, полученный через `/api/v1/auth/token/`, '
+            'даёт администратору доступ к `/api/v1/users/`'
+        )
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/users/me/')
+        assert response.json().get('username') == admin.username, (
+            'Проверьте, что GET запрос `/api/v1/users/me/` возвращает данные текущего пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_02_users_token_revoked_on_role_change(self, admin_client, moderator):
+        client = obtain_token_client(moderator)
+        client.patch('/api/v1/users/me/', data={'bio': 'new bio'})
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200, (
+            'Проверьте, что изменение данных, не хранящихся в токене, не отзывает токен'
+        )
+        admin_client.patch(f'/api/v1/users/{moderator.username}/', data={'role': 'user'})
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли пользователя его токен перестаёт действовать'
+        )
+        response = obtain_token_client(moderator).get('/api/v1/users/me/')
+        assert response.json().get('role') == 'user', (
+            'Проверьте, что новый токен выдаётся с новой ролью пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_03_users_token_revoked_on_delete(self, admin_client, user):
+        client = obtain_token_client(user)
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 401, (
+            'Проверьте, что после удаления пользователя его токен перестаёт действовать'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_04_users_token_revoked_after_cache_clear(self, admin_client, moderator):
+        client = obtain_token_client(moderator)
+        admin_client.patch(f'/api/v1/users/{moderator.username}/', data={'role': 'user'})
+        cache.clear()
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 401, (
+            'Проверьте, что версия токенов хранится в базе и отозванный токен '
+            'не начинает снова действовать после очистки кэша'
+        )
+        moderator.refresh_from_db()
+        moderator.save()
+        assert obtain_token_client(moderator).get('/api/v1/users/me/').status_code == 200, (
+            'Проверьте, что новый токен действует после повторного сохранения пользователя'
+        )
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что повторное сохранение пользователя не возвращает старую версию токенов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_05_users_token_version_read_from_primary(self, user, settings):
+        settings.DATABASE_ROUTERS = ['api.database.ReplicaRouter']
+        # Соединения replica нет: чтение из реплики завершилось бы ошибкой
+        token = read_database.set('replica')
+        try:
+            version = get_token_version(user.pk)
+        finally:
+            read_database.reset(token)
+        assert version == 0, (
+            'Проверьте, что версия токенов при промахе кэша читается из основной базы, а не из реплики'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_06_users_token_revoked_by_other_worker(self, user, settings):
+        settings.TOKEN_VERSION_CACHE_TIMEOUT = 1
+        client = obtain_token_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        # Другой воркер отозвал токены: в базе новая версия, кэш этого процесса прежний
+        get_user_model().objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+        time.sleep(1.1)
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что отзыв токенов в другом процессе действует '
+            'не позже чем через TOKEN_VERSION_CACHE_TIMEOUT секунд'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_13_01_users_bulk_create(self, admin_client, user_client, admin, django_assert_max_num_queries):
+        data = [
+            {'username': f'partner{number}', 'email': f'partner{number}@yamdb.fake', 'role': 'moderator'}
+            for number in range(20)
+        ]
+        response = user_client.post('/api/v1/users/bulk/', data=data, format='json')
+        assert response.status_code == 403, (
+            'Проверьте, что POST запрос `/api/v1/users/bulk/` доступен только администратору'
+        )
+        with django_assert_max_num_queries(5):
+            response = admin_client.post('/api/v1/users/bulk/', data=data, format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что POST запрос `/api/v1/users/bulk/` администратора создаёт пользователей '
+            'и возвращает статус 201'
+        )
+        created = get_user_model().objects.filter(username__startswith='partner', role='moderator')
+        assert created.count() == 20, (
+            'Проверьте, что POST запрос `/api/v1/users/bulk/` создаёт всех пользователей из списка'
+        )
+
+        response = admin_client.post('/api/v1/users/', data={'username': 'bulk', 'email': 'bulk@yamdb.fake'})
+        assert response.status_code == 400, (
+            'Проверьте, что имя bulk, занятое адресом `/api/v1/users/bulk/`, нельзя присвоить пользователю'
+        )
+
+        data = [
+            {'username': 'newbie', 'email': 'newbie@yamdb.fake'},
+            {'username': 'partner0', 'email': 'other@yamdb.fake'},
+            {'username': 'newbie2', 'email': 'newbie@yamdb.fake'},
+        ]
+        response = admin_client.post('/api/v1/users/bulk/', data=data, format='json')
+        errors = response.json()
+        assert response.status_code == 400 and errors[0] == {} and 'username' in errors[1] and 'email' in errors[2], (
+            'Проверьте, что POST запрос `/api/v1/users/bulk/` возвращает ошибки для каждого элемента списка'
+        )
+        assert not get_user_model().objects.filter(username='newbie').exists(), (
+            'Проверьте, что при ошибке в списке ни один пользователь не создаётся'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_13_02_users_bulk_roles(self, admin_client, admin, django_assert_max_num_queries):
+        user, moderator = create_users_api(admin_client)
+        moderator_client = obtain_token_client(moderator)
+        data = [
+            {'username': user.username, 'role': 'moderator'},
+            {'username': moderator.username, 'role': 'user'},
+        ]
+        with django_assert_max_num_queries(5):
+            response = admin_client.patch('/api/v1/users/bulk/roles/', data=data, format='json')
+        assert response.status_code == 200, (
+            'Проверьте, что PATCH запрос `/api/v1/users/bulk/roles/` администратора '
+            'возвращает статус 200'
+        )
+        user.refresh_from_db()
+        moderator.refresh_from_db()
+        assert (user.role, moderator.role) == ('moderator', 'user'), (
+            'Проверьте, что PATCH запрос `/api/v1/users/bulk/roles/` меняет роли пользователей'
+        )
+        assert moderator_client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что после массовой смены ролей старые токены пользователей перестают действовать'
+        )
+        user_client = obtain_token_client(user)
+        response = admin_client.patch(
+            '/api/v1/users/bulk/roles/', data=[{'username': user.username, 'role': 'moderator'}], format='json'
+        )
+        assert response.status_code == 200 and user_client.get('/api/v1/users/me/').status_code == 200, (
+            'Проверьте, что PATCH запрос `/api/v1/users/bulk/roles/` не отзывает токены пользователей, '
+            'чья роль не изменилась'
+        )
+
+        data = [{'username': user.username, 'role': 'admin'}, {'username': 'ghost', 'role': 'user'}]
+        response = admin_client.patch('/api/v1/users/bulk/roles/', data=data, format='json')
+        assert response.status_code == 400 and 'username' in response.json()[1], (
+            'Проверьте, что PATCH запрос `/api/v1/users/bulk/roles/` возвращает ошибки '
+            'для каждого элемента списка'
+        )
+        user.refresh_from_db()
+        assert user.role == 'moderator', (
+            'Проверьте, что при ошибке в списке роли не меняются'
+        )
@@ -1,4 +1,5 @@
 import pytest
+from django.db import transaction
 
 from .common import (auth_client, create_reviews, create_titles,
                      create_users_api)
@@ -334,3 +335,127 @@ class Test05ReviewAPI:
             'без токена авторизации возвращается статус 401'
         )
         self.check_permissions(user, 'обычного пользователя', reviews, titles)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_reviews_list_num_queries(self, client, admin_client, admin, django_assert_num_queries):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        # произведение, количество отзывов и сама страница вместе с авторами
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert {review['author'] for review in results} == {review['author'] for review in reviews}, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/` '
+            'автор отзыва загружается тем же запросом, что и сам отзыв'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_review_create_num_queries(self, admin_client, user_client, django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        data = {'text': 'Отличное произведение', 'score': 9}
+        # пользователь из токена, BEGIN точки сохранения и сама вставка отзыва
+        with django_assert_max_num_queries(3):
+            response = user_client.post(url, data=data)
+        assert response.status_code == 201, (
+            'Проверьте, что при POST запросе `/api/v1/titles/{title_id}/reviews/` '
+            'отзыв создаётся без предварительных проверочных запросов'
+        )
+        response = user_client.post(url, data=data)
+        assert response.status_code == 400, (
+            'Проверьте, что при POST запросе `/api/v1/titles/{title_id}/reviews/` '
+            'повторный отзыв отклоняется ограничением базы данных со статусом 400'
+        )
+        assert response.json() == {'non_field_errors': ['Вы уже оставляли отзыв на это произведение']}, (
+            'Проверьте, что при повторном отзыве возвращается прежнее сообщение об ошибке'
+        )
+        with transaction.atomic():
+            response = user_client.post(url, data=data)
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв отклоняется и внутри внешней транзакции (ATOMIC_REQUESTS)'
+        )
+        with transaction.atomic():
+            response = user_client.post('/api/v1/titles/99999/reviews/', data=data)
+        assert response.status_code == 404, (
+            'Проверьте, что отзыв на несуществующее произведение внутри внешней транзакции '
+            '(ATOMIC_REQUESTS) возвращает статус 404, а не ошибку при фиксации'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_reviews_bulk_create(self, admin_client, moderator_client, user_client, user, moderator,
+                                    django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/bulk/'
+        data = [{'text': 'Отзыв модератора', 'score': 8, 'author': user.username}]
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == 403, (
+            'Проверьте, что при POST запросе `/api/v1/titles/{title_id}/reviews/bulk/` '
+            'с токеном обычного пользователя возвращается статус 403'
+        )
+        # пользователь из токена, произведение, существующие отзывы, вставка и выборка id
+        with django_assert_max_num_queries(6):
+            response = moderator_client.post(url, data=data, format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что при POST запросе `/api/v1/titles/{title_id}/reviews/bulk/` '
+            'модератор может создать список отзывов'
+        )
+        created = response.json()
+        assert [review['author'] for review in created] == [moderator.username], (
+            'Проверьте, что автором отзывов, созданных списком, всегда становится текущий пользователь'
+        )
+        assert all(isinstance(review['id'], int) for review in created)
+
+        data = [
+            {'text': 'Ещё один отзыв', 'score': 5, 'title': titles[1]['id']},
+            {'text': 'Повтор', 'score': 5, 'title': titles[0]['id']},
+            {'text': 'Нет произведения', 'score': 5, 'title': 999},
+            {'text': 'Слишком большой id', 'score': 5, 'title': 10 ** 30},
+        ]
+        response = moderator_client.post('/api/v1/reviews/bulk/', data=data, format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что при POST запросе `/api/v1/reviews/bulk/` '
+            'с ошибочными элементами возвращается статус 400'
+        )
+        errors = response.json()
+        assert len(errors) == len(data) and errors[0] == {}, (
+            'Проверьте, что при POST запросе `/api/v1/reviews/bulk/` '
+            'ошибки возвращаются отдельно для каждого элемента списка'
+        )
+        assert 'non_field_errors' in errors[1] and 'title' in errors[2] and 'title' in errors[3]
+
+        response = moderator_client.post('/api/v1/reviews/bulk/', data=data[:1], format='json')
+        assert response.status_code == 201
+        assert response.json()[0]['title'] == titles[1]['id']
+        response = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/')
+        assert response.json()['count'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_reviews_feeds(self, client, admin_client, admin, django_assert_num_queries):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/reviews/latest/')
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/reviews/latest/` '
+            'без токена авторизации возвращается статус 200'
+        )
+        data = response.json()
+        assert 'next' in data and 'results' in data, (
+            'Проверьте, что лента `/api/v1/reviews/latest/` выдаётся постранично по курсору'
+        )
+        assert [review['id'] for review in data['results']] == [review['id'] for review in reversed(reviews)], (
+            'Проверьте, что лента `/api/v1/reviews/latest/` отсортирована от новых отзывов к старым'
+        )
+        assert data['results'][0]['title'] == {'id': titles[0]['id'], 'name': titles[0]['name']}, (
+            'Проверьте, что в ленте `/api/v1/reviews/latest/` для отзыва возвращается произведение'
+        )
+
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/users/{user.username}/reviews/')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [review['author'] for review in results] == [user.username], (
+            'Проверьте, что при GET запросе `/api/v1/users/{username}/reviews/` '
+            'возвращаются только отзывы этого пользователя'
+        )
+        response = client.get('/api/v1/users/nobody/reviews/')
+        assert response.status_code == 404
@@ -246,3 +246,62 @@ class Test06CommentAPI:
             'без токена авторизации возвращается статус 401'
         )
         self.check_permissions(user, 'обычного пользователя', f'{pre_url}{comments[2]["id"]}/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_comments_list_num_queries(self, client, admin_client, admin, django_assert_num_queries):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        # обзор, количество комментариев и сама страница вместе с авторами
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert {comment['author'] for comment in results} == {comment['author'] for comment in comments}, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/{review_id}/comments/` '
+            'автор комментария загружается тем же запросом, что и сам комментарий'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_comments_bulk_create(self, admin_client, admin):
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/bulk/'
+        data = [{'text': 'Первый'}, {'text': 'Второй', 'author': user.username}]
+        response = auth_client(user).post(url, data=data, format='json')
+        assert response.status_code == 403, (
+            'Проверьте, что при POST запросе `/api/v1/titles/{title_id}/reviews/{review_id}/comments/bulk/` '
+            'с токеном обычного пользователя возвращается статус 403'
+        )
+        response = auth_client(moderator).post(url, data=data, format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что при POST запросе `/api/v1/titles/{title_id}/reviews/{review_id}/comments/bulk/` '
+            'модератор может создать список комментариев'
+        )
+        created = response.json()
+        assert [comment['author'] for comment in created] == [moderator.username, moderator.username], (
+            'Проверьте, что автором комментариев, созданных списком, всегда становится текущий пользователь'
+        )
+        assert all(isinstance(comment['id'], int) for comment in created), (
+            'Проверьте, что в ответе на массовое создание комментариев есть их id'
+        )
+        response = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/')
+        assert response.json()['count'] == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_review_comments_count(self, client, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(reviews_url)
+        counts = {review['id']: review.get('comments_count') for review in response.json()['results']}
+        assert counts[reviews[0]['id']] == len(comments) and counts[reviews[1]['id']] == 0, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/reviews/` '
+            'для каждого отзыва возвращается количество комментариев `comments_count`'
+        )
+        response = admin_client.delete(f'{reviews_url}{reviews[0]["id"]}/comments/{comments[0]["id"]}/')
+        assert response.status_code == 204
+        response = admin_client.post(
+            f'{reviews_url}{reviews[0]["id"]}/comments/bulk/', data=[{'text': 'a'}, {'text': 'b'}], format='json'
+        )
+        assert response.status_code == 201
+        response = admin_client.get(f'{reviews_url}{reviews[0]["id"]}/')
+        assert response.json()['comments_count'] == len(comments) + 1, (
+            'Проверьте, что счётчик `comments_count` обновляется при создании и удалении комментариев'
+        )
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+
+from .common import create_titles
+
+
+def http_scope(path):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': []}
+
+
+class Test08EventsAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_events_stream(self, admin_client, user_client):
+        from api_yamdb.asgi import application
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/events/'
+
+        async def scenario():
+            communicator = ApplicationCommunicator(application, http_scope(url))
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output(timeout=5)
+            await communicator.receive_output(timeout=5)
+            await sync_to_async(user_client.post)(
+                f'/api/v1/titles/{titles[0]["id"]}/reviews/', data={'text': 'Событие', 'score': 7}
+            )
+            event = await communicator.receive_output(timeout=5)
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(timeout=5)
+            return start, event
+
+        start, event = async_to_sync(scenario)()
+        assert start['status'] == 200 and (b'content-type', b'text/event-stream; charset=utf-8') in start['headers'], (
+            f'Проверьте, что GET запрос `/api/v1/titles/{{title_id}}/events/` открывает поток Server-Sent Events'
+        )
+        assert event['body'].startswith(b'id: review-') and 'Событие'.encode() in event['body'], (
+            'Проверьте, что в поток `/api/v1/titles/{title_id}/events/` приходит событие о новом отзыве'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_02_bulk_reviews_events(self, admin_client, moderator_client):
+        from api_yamdb.asgi import application
+
+        titles, _, _ = create_titles(admin_client)
+
+        async def scenario():
+            communicator = ApplicationCommunicator(application, http_scope('/api/v1/events/'))
+            await communicator.send_input({'type': 'http.request'})
+            await communicator.receive_output(timeout=5)
+            await communicator.receive_output(timeout=5)
+            await sync_to_async(moderator_client.post)('/api/v1/reviews/bulk/', data=[
+                {'text': 'Первый из списка', 'score': 7, 'title': titles[0]['id']},
+                {'text': 'Второй из списка', 'score': 8, 'title': titles[1]['id']},
+            ], format='json')
+            events = [await communicator.receive_output(timeout=5) for _ in range(2)]
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(timeout=5)
+            return events
+
+        events = async_to_sync(scenario)()
+        assert ['Первый из списка'.encode() in events[0]['body'], 'Второй из списка'.encode() in events[1]['body']] == [True, True], (
+            'Проверьте, что об отзывах, созданных списком, публикуются события'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_unknown_title_stream(self):
+        from api_yamdb.asgi import application
+
+        async def scenario():
+            communicator = ApplicationCommunicator(application, http_scope('/api/v1/titles/999/events/'))
+            await communicator.send_input({'type': 'http.request'})
+            return await communicator.receive_output(timeout=5)
+
+        assert async_to_sync(scenario)()['status'] == 404
+
+    def test_03_unix_socket_backend(self, tmp_path):
+        from api.events import Broadcaster, UnixSocketBackend
+
+        publisher = Broadcaster(UnixSocketBackend(str(tmp_path)), queue_size=10)
+        subscriber = Broadcaster(UnixSocketBackend(str(tmp_path)), queue_size=10)
+
+        async def scenario():
+            subscription = subscriber.subscribe('title:1')
+            publisher.publish('title:1', {'event': 'review', 'data': {'id': 1}})
+            try:
+                return await asyncio.wait_for(subscription.get(), timeout=5)
+            finally:
+                subscription.close()
+
+        try:
+            assert async_to_sync(scenario)() == {'event': 'review', 'data': {'id': 1}}, (
+                'Проверьте, что UnixSocketBackend доставляет события подписчикам других воркеров'
+            )
+        finally:
+            publisher.backend.stop()
+            subscriber.backend.stop()
+
+    def test_04_unix_socket_backend_survives_bad_datagram(self, tmp_path):
+        from api.events import Broadcaster, UnixSocketBackend
+
+        publisher = Broadcaster(UnixSocketBackend(str(tmp_path)), queue_size=10)
+        subscriber = Broadcaster(UnixSocketBackend(str(tmp_path)), queue_size=10)
+
+        async def scenario():
+            subscription = subscriber.subscribe('title:1')
+            publisher.backend.sender.sendto(b'not json', subscriber.backend.path)
+            publisher.publish('title:1', {'event': 'review', 'data': {'id': 2}})
+            try:
+                return await asyncio.wait_for(subscription.get(), timeout=5)
+            finally:
+                subscription.close()
+
+        try:
+            assert async_to_sync(scenario)() == {'event': 'review', 'data': {'id': 2}}, (
+                'Проверьте, что повреждённая датаграмма не останавливает приём событий'
+            )
+        finally:
+            publisher.backend.stop()
+            subscriber.backend.stop()
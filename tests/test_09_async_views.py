@@ -0,0 +1,118 @@
+import asyncio
+import re
+import time
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.test import AsyncClient
+from django.urls import include, path
+
+from .common import create_comments, create_titles
+
+in_flight = {'now': 0, 'max': 0}
+
+
+async def slow_read(request):
+    in_flight['now'] += 1
+    in_flight['max'] = max(in_flight['max'], in_flight['now'])
+    try:
+        await sync_to_async(time.sleep, thread_sensitive=False)(0.05)
+    finally:
+        in_flight['now'] -= 1
+    return JsonResponse({})
+
+
+urlpatterns = [
+    path('api/v1/slow/', slow_read),
+    path('api/v1/', include('api.async_urls')),
+]
+
+
+class Test09AsyncViewsAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_async_reads_match_sync_reads(self, client, admin_client, admin, settings):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        urls = (
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+            '/api/v1/titles/',
+            '/api/v1/titles/?genre=horror',
+            f'/api/v1/titles/{titles[0]["id"]}/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/',
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/comments/{comments[0]["id"]}/',
+        )
+        expected = {url: admin_client.get(url).json() for url in urls}
+
+        settings.ROOT_URLCONF = __name__
+        for url in urls:
+            response = client.get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что асинхронный GET запрос `{url}` возвращает статус 200'
+            )
+            assert response.json() == expected[url], (
+                f'Проверьте, что асинхронный GET запрос `{url}` возвращает те же данные, что и синхронный'
+            )
+        response = client.get('/api/v1/titles/999/')
+        assert response.status_code == 404 and 'detail' in response.json()
+        response = client.get('/api/v1/titles/?year=abc')
+        assert response.status_code == 400 and 'year' in response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_async_urls_pass_writes_to_viewsets(self, client, admin_client, settings):
+        settings.ROOT_URLCONF = __name__
+        data = {'name': 'Фильм', 'slug': 'films'}
+        response = client.post('/api/v1/categories/', data=data)
+        assert response.status_code == 401, (
+            'Проверьте, что POST запрос через асинхронные маршруты проверяет авторизацию'
+        )
+        response = admin_client.post('/api/v1/categories/', data=data)
+        assert response.status_code == 201
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 401
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_async_reads_authenticate_and_are_timed(self, client, admin_client, settings):
+        create_titles(admin_client)
+        settings.ROOT_URLCONF = __name__
+        response = client.get('/api/v1/titles/', HTTP_AUTHORIZATION='Bearer invalid')
+        assert response.status_code == 401, (
+            'Проверьте, что асинхронные GET запросы проверяют токен так же, как синхронные'
+        )
+        response = admin_client.get('/api/v1/titles/')
+        queries = re.search(r'db;[^,]*desc="(\d+) queries"', response['Server-Timing'])
+        assert response.status_code == 200 and int(queries.group(1)) >= 2, (
+            'Проверьте, что SQL-запросы асинхронных представлений попадают в Server-Timing'
+        )
+
+    def test_04_asgi_reads_run_concurrently(self, settings):
+        settings.ROOT_URLCONF = __name__
+        in_flight.update(now=0, max=0)
+        client = AsyncClient()
+
+        async def read_all():
+            return await asyncio.gather(*(client.get('/api/v1/slow/') for _ in range(20)))
+
+        started = time.perf_counter()
+        responses = asyncio.run(read_all())
+        elapsed = time.perf_counter() - started
+        assert all(response.status_code == 200 for response in responses)
+        assert 'Server-Timing' in responses[0], (
+            'Проверьте, что ServerTimingMiddleware замеряет запросы и под ASGI'
+        )
+        assert in_flight['max'] > 1 and elapsed < 20 * 0.05, (
+            'Проверьте, что middleware по умолчанию поддерживают асинхронный стек '
+            'и не заставляют ASGI выполнять асинхронные представления по одному'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_asgi_sync_views_are_timed(self, admin_client):
+        create_titles(admin_client)
+        response = asyncio.run(AsyncClient().get('/api/v1/titles/'))
+        queries = re.search(r'db;[^,]*desc="(\d+) queries"', response['Server-Timing'])
+        assert response.status_code == 200 and int(queries.group(1)) >= 2, (
+            'Проверьте, что под ASGI SQL-запросы синхронных представлений попадают в Server-Timing'
+        )
@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+from django.core.mail.backends.base import BaseEmailBackend
+
+from api.mail import mail_queue
+
+
+class FlakyEmailBackend(BaseEmailBackend):
+    failures = 0
+
+    def send_messages(self, email_messages):
+        if FlakyEmailBackend.failures:
+            FlakyEmailBackend.failures -= 1
+            raise ConnectionError('SMTP недоступен')
+        return len(email_messages)
+
+
+class Test10MailQueue:
+    url_signup = '/api/v1/auth/signup/'
+    data = {'email': 'queued@yamdb.fake', 'username': 'queued'}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_sends_mail_in_background(self, client, settings, tmp_path):
+        settings.EMAIL_QUEUE_EAGER = False
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+        settings.EMAIL_FILE_PATH = str(tmp_path)
+        response = client.post(self.url_signup, data=self.data)
+        assert response.status_code == 200, (
+            f'Проверьте, что POST запрос `{self.url_signup}` возвращает статус 200'
+        )
+        assert mail_queue.join(timeout=5), (
+            'Проверьте, что фоновый поток отправляет письма из очереди'
+        )
+        sent = [path.read_text() for path in tmp_path.iterdir()]
+        assert len(sent) == 1 and self.data['email'] in sent[0], (
+            'Проверьте, что письмо с кодом подтверждения записывается бэкендом почты'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_failed_mail_is_retried(self, client, settings, tmp_path):
+        settings.EMAIL_QUEUE_EAGER = False
+        settings.EMAIL_BACKEND = 'tests.test_10_mail.FlakyEmailBackend'
+        settings.EMAIL_DEAD_LETTER_FILE = str(tmp_path / 'dead_letter.log')
+        FlakyEmailBackend.failures = 2
+        client.post(self.url_signup, data=self.data)
+        assert mail_queue.join(timeout=5), (
+            'Проверьте, что письмо отправляется повторно после ошибки'
+        )
+        assert FlakyEmailBackend.failures == 0 and not os.path.exists(settings.EMAIL_DEAD_LETTER_FILE), (
+            'Проверьте, что письмо, отправленное с повторной попытки, не попадает в журнал ошибок'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_undelivered_mail_is_dead_lettered(self, client, settings, tmp_path):
+        settings.EMAIL_BACKEND = 'tests.test_10_mail.FlakyEmailBackend'
+        settings.EMAIL_DEAD_LETTER_FILE = str(tmp_path / 'dead_letter.log')
+        FlakyEmailBackend.failures = settings.EMAIL_QUEUE_MAX_RETRIES + 1
+        response = client.post(self.url_signup, data=self.data)
+        assert response.status_code == 200, (
+            'Проверьте, что ошибка отправки письма не влияет на ответ регистрации'
+        )
+        with open(settings.EMAIL_DEAD_LETTER_FILE, encoding='utf-8') as dead_letters:
+            records = [json.loads(line) for line in dead_letters]
+        assert len(records) == 1 and records[0]['message']['recipient_list'] == [self.data['email']], (
+            'Проверьте, что неотправленное письмо записывается в журнал ошибок'
+        )
+        assert records[0]['attempts'] == settings.EMAIL_QUEUE_MAX_RETRIES + 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_mail_is_sent_in_batches(self, client, settings, tmp_path):
+        settings.EMAIL_QUEUE_EAGER = False
+        settings.EMAIL_BATCH_WINDOW = 1
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+        settings.EMAIL_FILE_PATH = str(tmp_path)
+        before = mail_queue.metrics()
+        for number in range(3):
+            client.post(self.url_signup, data={
+                'email': f'batch{number}@yamdb.fake', 'username': f'batch{number}'
+            })
+        assert mail_queue.join(timeout=5)
+        after = mail_queue.metrics()
+        assert after['batches'] - before['batches'] == 1 and after['sent'] - before['sent'] == 3, (
+            'Проверьте, что письма, пришедшие за окно пакета, отправляются одним пакетом'
+        )
+        assert after['max_batch_size'] >= 3 and after['throughput'] > 0, (
+            'Проверьте, что очередь считает размер пакетов и пропускную способность'
+        )
+        sent = [path.read_text() for path in tmp_path.iterdir()]
+        assert len(sent) == 1 and all(f'batch{number}@yamdb.fake' in sent[0] for number in range(3)), (
+            'Проверьте, что письма пакета отправляются через одно соединение'
+        )
@@ -0,0 +1,232 @@
+import sqlite3
+import threading
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from api.database import ReplicaRouter, close_replaced_replica
+from api.middleware import ReplicaRoutingMiddleware
+from api.slow_queries import fingerprint, read_log
+from api.writer import WriteNotStarted, WritePending, write_queue
+from reviews.models import Genre, Review, Title
+
+from .common import auth_client, create_reviews, create_titles
+
+
+class Test11Database:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_sqlite_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            for name in ('busy_timeout', 'cache_size'):
+                cursor.execute(f'PRAGMA {name}')
+                value = cursor.fetchone()[0]
+                assert value == settings.SQLITE_PRAGMAS[name], (
+                    f'Проверьте, что прагма {name} выполняется при подключении к SQLite'
+                )
+            cursor.execute('PRAGMA temp_store')
+            assert cursor.fetchone()[0] == 2, (
+                'Проверьте, что временные таблицы SQLite хранятся в памяти'
+            )
+
+    def test_02_refresh_replica(self, tmp_path):
+        source, target = str(tmp_path / 'primary.sqlite3'), str(tmp_path / 'replica.sqlite3')
+        primary = sqlite3.connect(source)
+        primary.execute('PRAGMA journal_mode = WAL')
+        primary.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        primary.executemany('INSERT INTO item VALUES (?)', [(number,) for number in range(100)])
+        primary.commit()
+        call_command('refresh_replica', source=source, target=target, stdout=StringIO())
+        primary.execute('INSERT INTO item VALUES (100)')
+        primary.commit()
+        replica = sqlite3.connect(target)
+        assert replica.execute('SELECT count(*) FROM item').fetchone()[0] == 100, (
+            'Проверьте, что команда refresh_replica копирует основную базу в файл реплики'
+        )
+        assert replica.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+        replica.close()
+        call_command('refresh_replica', source=source, target=target, stdout=StringIO())
+        replica = sqlite3.connect(target)
+        assert replica.execute('SELECT count(*) FROM item').fetchone()[0] == 101, (
+            'Проверьте, что повторный запуск refresh_replica обновляет реплику'
+        )
+        replica.close()
+        primary.close()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_02_replica_connection_reopened(self, tmp_path, settings):
+        source, target = str(tmp_path / 'primary.sqlite3'), str(tmp_path / 'replica.sqlite3')
+        primary = sqlite3.connect(source)
+        primary.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        primary.commit()
+        call_command('refresh_replica', source=source, target=target, stdout=StringIO())
+        settings.DATABASE_REPLICA = 'replica'
+        connections['replica'] = DatabaseWrapper({**connection.settings_dict, 'NAME': target}, 'replica')
+        try:
+            connections['replica'].ensure_connection()
+            close_replaced_replica()
+            assert connections['replica'].connection is not None, (
+                'Проверьте, что соединение с неизменённой репликой не закрывается'
+            )
+            primary.execute('INSERT INTO item VALUES (1)')
+            primary.commit()
+            call_command('refresh_replica', source=source, target=target, stdout=StringIO())
+            close_replaced_replica()
+            with connections['replica'].cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM item')
+                assert cursor.fetchone()[0] == 1, (
+                    'Проверьте, что постоянное соединение с репликой переоткрывается '
+                    'после подмены файла командой refresh_replica'
+                )
+        finally:
+            connections['replica'].close()
+            del connections['replica']
+            primary.close()
+
+    def test_03_replica_routing(self, settings):
+        settings.DATABASE_REPLICA = 'replica'
+        router = ReplicaRouter()
+        middleware = ReplicaRoutingMiddleware(
+            lambda request: HttpResponse(router.db_for_read(Title), status=201)
+        )
+        factory = RequestFactory()
+        writer = {'HTTP_AUTHORIZATION': 'Bearer writer'}
+        reader = {'HTTP_AUTHORIZATION': 'Bearer reader'}
+        assert middleware(factory.get('/api/v1/titles/', **writer)).content == b'replica', (
+            'Проверьте, что безопасные запросы читают реплику'
+        )
+        assert middleware(factory.post('/api/v1/titles/', **writer)).content == b'default', (
+            'Проверьте, что небезопасные запросы читают основную базу'
+        )
+        assert middleware(factory.get('/api/v1/titles/', **writer)).content == b'default', (
+            'Проверьте, что после записи клиент некоторое время читает основную базу'
+        )
+        assert middleware(factory.get('/api/v1/titles/', **reader)).content == b'replica', (
+            'Проверьте, что запись одного клиента не переключает на основную базу других клиентов'
+        )
+        assert router.db_for_read(Title) == 'default' and router.db_for_write(Title) == 'default', (
+            'Проверьте, что вне запросов чтение и запись идут в основную базу'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_single_writer_batches(self):
+        started, release = threading.Event(), threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait(5)
+
+        def create_genre(number):
+            if number == 3:
+                raise ValueError('Ошибка записи')
+            return Genre.objects.create(name=f'Жанр {number}', slug=f'genre-{number}').pk
+
+        before = dict(write_queue.stats)
+        write_queue.submit(blocker)
+        started.wait(5)
+        futures = [write_queue.submit(create_genre, number) for number in range(10)]
+        release.set()
+        with pytest.raises(ValueError):
+            futures[3].result(5)
+        results = [future.result(5) for number, future in enumerate(futures) if number != 3]
+        assert Genre.objects.filter(pk__in=results).count() == 9, (
+            'Проверьте, что ошибка одной записи пакета не откатывает остальные'
+        )
+        assert write_queue.stats['batches'] - before['batches'] == 2, (
+            'Проверьте, что накопившиеся записи выполняются одним пакетом'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_02_single_writer_timeout(self, settings):
+        settings.SINGLE_WRITER_TIMEOUT = 0.5
+        started, release = threading.Event(), threading.Event()
+
+        def blocker(slug):
+            started.set()
+            release.wait(5)
+            return Genre.objects.create(name=f'Жанр {slug}', slug=slug).pk
+
+        write_queue.submit(blocker, 'first')
+        started.wait(5)
+        try:
+            with pytest.raises(WriteNotStarted):
+                write_queue.run(Genre.objects.create, name='Отменённый жанр', slug='cancelled')
+        finally:
+            release.set()
+        started.clear()
+        release.clear()
+        try:
+            with pytest.raises(WritePending):
+                write_queue.run(blocker, 'pending')
+        finally:
+            release.set()
+        slugs = write_queue.run(lambda: set(Genre.objects.values_list('slug', flat=True)))
+        assert 'cancelled' not in slugs, (
+            'Проверьте, что запись, которая не дождалась потока-писателя, отменяется'
+        )
+        assert 'pending' in slugs, (
+            'Проверьте, что уже начатая запись не считается неудачной и фиксируется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_single_writer_api(self, settings, admin_client, admin):
+        settings.SINGLE_WRITER = True
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        client = auth_client(user)
+        url = f'/api/v1/titles/{titles[1]["id"]}/reviews/'
+        response = client.post(url, data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 201, (
+            'Проверьте, что при SINGLE_WRITER отзыв создаётся потоком-писателем'
+        )
+        response = client.post(url, data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 400, (
+            'Проверьте, что при SINGLE_WRITER повторный отзыв возвращает статус 400'
+        )
+        response = client.post('/api/v1/titles/100500/reviews/', data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 404, (
+            'Проверьте, что при SINGLE_WRITER отзыв на несуществующее произведение возвращает статус 404'
+        )
+        review_id = reviews[0]['id']
+        response = client.post(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{review_id}/comments/', data={'text': 'Комментарий'}
+        )
+        assert response.status_code == 201 and Review.objects.get(pk=review_id).comments_count == 1, (
+            'Проверьте, что при SINGLE_WRITER комментарий и счётчик комментариев записываются вместе'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_slow_query_log(self, settings, tmp_path, admin_client):
+        create_titles(admin_client)
+        log_file = tmp_path / 'slow_queries.log'
+        settings.SLOW_QUERY_THRESHOLD = 0
+        settings.SLOW_QUERY_LOG_FILE = str(log_file)
+        admin_client.get('/api/v1/titles/', {'genre': 'ganr'})
+        admin_client.get('/api/v1/titles/', {'genre': 'genre'})
+        records = [record for record in read_log(log_file) if 'reviews_title' in record['sql']]
+        assert records and all(record['view'] == 'api:title-list' for record in records), (
+            'Проверьте, что медленные запросы записываются в журнал с именем представления'
+        )
+        assert any(record['plan'] for record in records), (
+            'Проверьте, что для медленных SELECT-запросов записывается EXPLAIN QUERY PLAN'
+        )
+        assert len({record['fingerprint'] for record in records}) < len(records), (
+            'Проверьте, что запросы, различающиеся только параметрами, получают один отпечаток'
+        )
+        output = StringIO()
+        call_command('slow_queries', file=str(log_file), top=3, stdout=output)
+        assert 'api:title-list' in output.getvalue(), (
+            'Проверьте, что команда slow_queries строит отчёт по журналу'
+        )
+
+    def test_07_sql_fingerprint(self):
+        assert fingerprint(
+            "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'  LIMIT 10"
+        ) == 'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?', (
+            'Проверьте, что отпечаток запроса не зависит от значений параметров'
+        )
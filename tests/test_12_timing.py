@@ -0,0 +1,156 @@
+import gc
+import json
+import logging
+import re
+import threading
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.mail import mail_queue
+from api.metrics import MetricsRegistry, registry
+
+from .common import create_titles, obtain_token_client
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+class Test12ServerTiming:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_server_timing_header(self, admin_client, admin, caplog):
+        create_titles(admin_client)
+        client = obtain_token_client(admin)
+        with caplog.at_level(logging.INFO, logger='api.timing'):
+            response = client.get('/api/v1/titles/')
+        assert 'Server-Timing' in response, (
+            'Проверьте, что ответы `/api/v1/` содержат заголовок Server-Timing'
+        )
+        metrics = parse_server_timing(response['Server-Timing'])
+        assert {'total', 'db', 'filter', 'query', 'serialize', 'cache'} <= set(metrics), (
+            'Проверьте, что Server-Timing содержит общее время, время базы, фазы представления и кэш'
+        )
+        queries = re.fullmatch(r'"(\d+) queries"', metrics['db']['desc'])
+        assert queries and int(queries.group(1)) > 0, (
+            'Проверьте, что Server-Timing содержит число SQL-запросов'
+        )
+        assert metrics['cache']['desc'] == '"hits=1 misses=0"', (
+            'Проверьте, что Server-Timing учитывает обращения к кэшу, например к версии токена'
+        )
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['path'] == '/api/v1/titles/' and record['queries'] == int(queries.group(1)) and 'serialize_ms' in record, (
+            'Проверьте, что замеры запроса пишутся строкой JSON в журнал api.timing'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_server_timing_api_only(self, admin_client):
+        response = admin_client.get('/admin/login/')
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что Server-Timing добавляется только к запросам `/api/v1/`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_metrics_endpoint(self, client, admin_client):
+        create_titles(admin_client)
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/100500/')
+        response = client.get('/metrics')
+        assert response.status_code == 200 and response['Content-Type'].startswith('text/plain'), (
+            'Проверьте, что `/metrics` отдаёт метрики в текстовом формате Prometheus'
+        )
+        text = response.content.decode()
+        for line in (
+            '# TYPE yamdb_request_duration_seconds histogram',
+            'yamdb_requests_total{route="api:title-list",method="GET",status="200"}',
+            'yamdb_requests_total{route="api:title-detail",method="GET",status="404"}',
+            'yamdb_request_duration_seconds_bucket{route="api:title-list",method="GET",le="+Inf"}',
+            'yamdb_db_queries_total{route="api:title-list",method="GET"}',
+            '# TYPE yamdb_mail_queue_size gauge',
+            'yamdb_mail_retries_total ',
+            'yamdb_mail_dead_letters_total ',
+        ):
+            assert line in text, (
+                f'Проверьте, что `/metrics` содержит `{line}`'
+            )
+        response = client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        assert response.status_code == 403, (
+            'Проверьте, что `/metrics` доступен только адресам из METRICS_ALLOWED_IPS'
+        )
+
+    def test_04_metrics_multiprocess(self, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        (tmp_path / '1.json').write_text(json.dumps({
+            'requests': [['api:genre-list', 'GET', 200, [5, 0.5, 10] + [5] + [0] * 11]],
+            'values': {'yamdb_mail_sent_total': 7},
+        }))
+        before = registry.snapshot().get(('api:genre-list', 'GET', 200), [0])[0]
+        registry.observe('api:genre-list', 'GET', 200, 0.003, 2)
+        collected, values = registry.collect()
+        assert collected[('api:genre-list', 'GET', 200)][0] == before + 6, (
+            'Проверьте, что метрики суммируются по файлам всех воркеров в METRICS_DIR'
+        )
+        assert values['yamdb_mail_sent_total'] == 7 + mail_queue.metrics()['sent'], (
+            'Проверьте, что метрики очереди писем суммируются по воркерам'
+        )
+        assert any(path.name.endswith('.json') and path.name != '1.json' for path in tmp_path.iterdir()), (
+            'Проверьте, что процесс сохраняет свои метрики в METRICS_DIR'
+        )
+        call_command('clear_metrics', stdout=StringIO())
+        assert not list(tmp_path.iterdir()), (
+            'Проверьте, что команда clear_metrics удаляет файлы метрик из METRICS_DIR'
+        )
+
+    def test_04_02_metrics_thread_shards(self):
+        metrics = MetricsRegistry()
+        threads = [
+            threading.Thread(target=metrics.observe, args=('api:genre-list', 'GET', 200, 0.003, 1))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        gc.collect()
+        assert not metrics.shards, (
+            'Проверьте, что счётчики завершившихся потоков не хранятся отдельно'
+        )
+        count, _, queries = metrics.snapshot()[('api:genre-list', 'GET', 200)][:3]
+        assert count == 10 and queries == 10, (
+            'Проверьте, что счётчики завершившихся потоков сохраняются в общем итоге'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_profile_request(self, settings, tmp_path, admin_client, user_client):
+        settings.PROFILE_DIR = str(tmp_path)
+        response = admin_client.get('/api/v1/titles/')
+        assert 'X-Profile-Id' not in response and not list(tmp_path.iterdir()), (
+            'Проверьте, что запросы без заголовка X-Profile не профилируются'
+        )
+        response = user_client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        assert 'X-Profile-Id' not in response and not list(tmp_path.iterdir()), (
+            'Проверьте, что профилировать запросы могут только администраторы'
+        )
+        response = admin_client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        assert response.status_code == 200 and 'X-Profile-Id' in response, (
+            'Проверьте, что запрос администратора с заголовком `X-Profile: 1` профилируется '
+            'и ответ содержит заголовок X-Profile-Id'
+        )
+        profile_url = response['X-Profile-Url']
+        response = admin_client.get(profile_url, {'output': 'text'})
+        assert response.status_code == 200 and 'cumulative' in response.content.decode(), (
+            'Проверьте, что администратор может посмотреть сохранённый профиль'
+        )
+        response = admin_client.get(profile_url)
+        assert response.status_code == 200 and response['Content-Disposition'].startswith('attachment'), (
+            'Проверьте, что профиль можно скачать файлом'
+        )
+        response = user_client.get(profile_url)
+        assert response.status_code == 403, (
+            'Проверьте, что профили доступны только администраторам'
+        )
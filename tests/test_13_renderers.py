@@ -0,0 +1,105 @@
+import datetime
+import decimal
+import io
+import uuid
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+def sample_data():
+    return ReturnDict({
+        'count': 2,
+        'results': ReturnList([
+            {
+                'id': 1, 'name': 'Поворот туда', 'rating': None,
+                'pub_date': datetime.datetime(2021, 5, 1, 12, 30, tzinfo=datetime.timezone.utc),
+                'day': datetime.date(2021, 5, 1),
+                'score': decimal.Decimal('7.5'),
+                'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+                'detail': gettext_lazy('Not found.'),
+                'text': 'строка с разделителем \u2028 и \u2029',
+            },
+            {1: 'ключ-число', 'nested': [True, False, 1.5]},
+        ], serializer=None),
+    }, serializer=None)
+
+
+class Test13Renderers:
+
+    def test_01_renderer_matches_drf(self):
+        data = sample_data()
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data), (
+            'Проверьте, что FastJSONRenderer отдаёт тот же JSON, что и JSONRenderer DRF'
+        )
+        assert FastJSONRenderer().render(data, 'application/json; indent=4') == (
+            JSONRenderer().render(data, 'application/json; indent=4')
+        ), (
+            'Проверьте, что FastJSONRenderer поддерживает отступы из заголовка Accept'
+        )
+
+    def test_02_parser_matches_drf(self):
+        body = JSONRenderer().render(sample_data())
+        assert FastJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body)), (
+            'Проверьте, что FastJSONParser разбирает JSON так же, как JSONParser DRF'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_api_uses_fast_json(self, admin_client):
+        response = admin_client.post('/api/v1/genres/', {'name': 'Жанр', 'slug': 'genre'}, format='json')
+        assert response.status_code == 201 and response.json() == {'name': 'Жанр', 'slug': 'genre'}, (
+            'Проверьте, что API принимает и отдаёт JSON через FastJSONParser и FastJSONRenderer'
+        )
+        assert response.accepted_renderer.__class__ is FastJSONRenderer, (
+            'Проверьте, что FastJSONRenderer указан первым в DEFAULT_RENDERER_CLASSES'
+        )
+
+    def test_04_msgpack_matches_json(self):
+        msgpack = pytest.importorskip('msgpack')
+        data = sample_data()
+        data['results'].pop()
+        body = MessagePackRenderer().render(data)
+        json_body = JSONRenderer().render(data)
+        assert msgpack.unpackb(body) == JSONParser().parse(io.BytesIO(json_body)), (
+            'Проверьте, что MessagePackRenderer кодирует даты, Decimal и ленивые строки так же, как JSON'
+        )
+        assert len(body) < len(json_body), (
+            'Проверьте, что MessagePack компактнее JSON'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_msgpack_negotiation(self, admin_client):
+        msgpack = pytest.importorskip('msgpack')
+        response = admin_client.post(
+            '/api/v1/genres/', msgpack.packb({'name': 'Жанр', 'slug': 'genre'}),
+            content_type='application/msgpack', HTTP_ACCEPT='application/msgpack'
+        )
+        assert response.status_code == 201 and response['Content-Type'] == 'application/msgpack', (
+            'Проверьте, что API принимает MessagePack и отвечает в нём при `Accept: application/msgpack`'
+        )
+        assert msgpack.unpackb(response.content) == {'name': 'Жанр', 'slug': 'genre'}, (
+            'Проверьте, что ответ в MessagePack содержит те же данные, что и JSON'
+        )
+        response = admin_client.get('/api/v1/genres/')
+        assert response['Content-Type'] == 'application/json', (
+            'Проверьте, что без явного Accept API отвечает в JSON'
+        )
+        response = admin_client.get('/api/v1/genres/', HTTP_ACCEPT='text/html,application/xhtml+xml,*/*;q=0.8')
+        assert response['Content-Type'].startswith('text/html'), (
+            'Проверьте, что браузеры по-прежнему получают браузерный API'
+        )
+
+    @pytest.mark.parametrize('value', [float('nan'), float('inf'), -float('inf')])
+    def test_06_renderer_rejects_non_finite(self, value):
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            with pytest.raises(ValueError):
+                renderer.render({'n': value, 'nested': [None]})
+        assert FastJSONRenderer().render({'n': None}) == JSONRenderer().render({'n': None}), (
+            'Проверьте, что FastJSONRenderer по-прежнему отдаёт null для None'
+        )